@@ -1,56 +1,429 @@
+import bisect
+import concurrent.futures
 import csv
 import datetime
 import functools
+import hashlib
+import io
 import itertools
 import os
+import warnings
 
 import openpyxl
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
-from matplotlib import pyplot
+from matplotlib.figure import Figure
 import matplotlib
 
 import pandas as pd
 import numpy as np
+import scipy.special
+import scipy.stats
 
-__all__ = ['StatBot', 'CreedLickometer', 'VolumeData']
+__all__ = ['StatBot', 'CreedLickometer', 'VolumeData', 'Transitions', 'PlotMany', 'PlotCohort']
+
+class Transitions:
+	"""
+	Compact storage of beam transitions as a structured array of (datetime, milliseconds, beam, delta) columns.
+	Iterating and indexing gives back (datetime, milliseconds integer, Beam open, delta) tuples
+	 so it can be used as if it were a list of tuples.
+	Slicing gives a Transitions that is a view of the same data (no copy).
+	"""
+
+	dtype = np.dtype([('dt', 'datetime64[us]'), ('ms', np.int64), ('beam', np.bool_), ('delta', np.int32)])
+
+	# First transition has no prior to take a delta from, stored as this and given back as None
+	NoDelta = np.iinfo(np.int32).min
+
+	def __init__(self, data=None):
+		if data is None:
+			data = np.empty(0, dtype=self.dtype)
+		self.Data = data
+
+		# Incremented whenever changed in place
+		self.Version = 0
+
+	@classmethod
+	def FromColumns(cls, dts, mss, beams, deltas):
+		"""
+		Create from column arrays. @deltas can contain None (or use Transitions.NoDelta) for no prior.
+		"""
+
+		deltas = np.array([cls.NoDelta if _ is None else _ for _ in deltas] if isinstance(deltas, list) else deltas, dtype=np.int64)
+		if len(deltas) and (deltas.max() > np.iinfo(np.int32).max or deltas.min() < cls.NoDelta):
+			raise ValueError("Transition delta out of range: %d to %d" % (deltas.min(), deltas.max()))
+
+		data = np.empty(len(mss), dtype=cls.dtype)
+		data['dt'] = dts
+		data['ms'] = mss
+		data['beam'] = beams
+		data['delta'] = deltas
+		return cls(data)
+
+	@classmethod
+	def FromTuples(cls, rows):
+		"""
+		Create from an iterable of (datetime, milliseconds integer, Beam open, delta) tuples.
+		"""
+
+		rows = list(rows)
+		if not len(rows):
+			return cls()
+
+		dts,mss,beams,deltas = zip(*rows)
+		return cls.FromColumns(np.array(dts, dtype='datetime64[us]'), mss, beams, list(deltas))
+
+	@staticmethod
+	def Concatenate(*parts):
+		"""
+		Join multiple Transitions together in order.
+		"""
+
+		return Transitions(np.concatenate([_.Data for _ in parts]))
+
+	def Offset(self, ms):
+		"""
+		Return a copy with @ms added to the milliseconds.
+		"""
+
+		data = self.Data.copy()
+		data['ms'] += ms
+		return Transitions(data)
+
+	def _Tuple(self, rec):
+		delta = int(rec['delta'])
+		return (rec['dt'].item(), int(rec['ms']), bool(rec['beam']), None if delta == self.NoDelta else delta)
+
+	def __len__(self):
+		return len(self.Data)
+
+	def __iter__(self):
+		deltas = [None if _ == self.NoDelta else _ for _ in self.Data['delta'].tolist()]
+		return zip(self.Data['dt'].tolist(), self.Data['ms'].tolist(), self.Data['beam'].tolist(), deltas)
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return Transitions(self.Data[idx])
+		return self._Tuple(self.Data[idx])
+
+	def __delitem__(self, idx):
+		# Removing from either end is just a view of the remaining data
+		if idx == 0:
+			self.Data = self.Data[1:]
+		elif idx == -1 or idx == len(self.Data)-1:
+			self.Data = self.Data[:-1]
+		else:
+			self.Data = np.delete(self.Data, idx)
+		self.Version += 1
+
+	def pop(self, idx=-1):
+		row = self[idx]
+		del self[idx]
+		return row
+
+	def append(self, row):
+		self.Data = np.concatenate( (self.Data, Transitions.FromTuples([row]).Data) )
+		self.Version += 1
+
+	def __repr__(self):
+		return "<%s len=%d>" % (self.__class__.__name__, len(self.Data))
 
 class StatBot:
 	"""
 	Do a bunch of basic stats on data
+	Stats are updated in one pass as data is added (Update) and two StatBots can be combined (Merge).
+	Count, sum, minimum, maximum, and mean are exact.
+	Quantiles are exact if the data is kept (@keep), otherwise they are estimated from a sketch of the data that
+	 is within a relative error of @alpha of the actual value (the DDSketch of Masson, Rim, and Lee).
+	Kept data is sorted once when first needed and then percentile, trimmed mean, histogram, and CDF queries
+	 are read from the sorted data.
 	"""
-	def __init__(self, dat):
-		self.Data = list(dat)
-		self.Length = len(self.Data)
-		self.Sum = sum(self.Data)
 
+	# Quantiles that are made available as attributes
+	Quantiles = [0.25,0.5,0.75,0.90,0.95,0.99]
+
+	def __init__(self, dat=(), keep=True, alpha=0.01):
+		self.Keep = keep
+		self.Alpha = alpha
+		self.Gamma = (1+alpha)/(1-alpha)
+
+		self.Length = 0
+		self.Sum = 0
+		self.Minimum = None
+		self.Maximum = None
+
+		# Kept data as a list of arrays that are only joined when needed
+		self._Chunks = []
+
+		# Sketch of the data as counts of values in logarithmically sized buckets (by bucket index)
+		#  for positive values and negative values (negated), and the count of zeroes
+		self._Positive = {}
+		self._Negative = {}
+		self._Zero = 0
+
+		# Values of Quantiles, sorted data, and prefix sums of sorted data, made when first needed
+		self._Q = None
+		self._Sorted = None
+		self._Prefix = None
+
+		self.Update(dat)
+
+	def Update(self, dat):
+		"""
+		Add the values in @dat to the stats. Returns self.
+		"""
+
+		if not isinstance(dat, np.ndarray):
+			dat = np.array(list(dat))
+		if not len(dat):
+			return self
+
+		self.Length += len(dat)
+		self.Sum += dat.sum()
+		self.Minimum = dat.min() if self.Minimum is None else min(self.Minimum, dat.min())
+		self.Maximum = dat.max() if self.Maximum is None else max(self.Maximum, dat.max())
+
+		if self.Keep:
+			self._Chunks.append(dat)
+
+		# Bucket i covers (Gamma^(i-1), Gamma^i]
+		for store,vals in ((self._Positive, dat[dat > 0]), (self._Negative, -dat[dat < 0])):
+			if len(vals):
+				keys,counts = np.unique(np.ceil(np.log(vals.astype(np.float64)) / np.log(self.Gamma)).astype(np.int64), return_counts=True)
+				for k,c in zip(keys.tolist(), counts.tolist()):
+					store[k] = store.get(k, 0) + c
+		self._Zero += int(np.count_nonzero(dat == 0))
+
+		self._Q = None
+		self._Sorted = None
+		self._Prefix = None
+		return self
+
+	def Merge(self, other):
+		"""
+		Combine the stats of this and @other into a new StatBot, as if all of the data had been given to one StatBot.
+		Data is only kept if both kept their data.
+		"""
+
+		if self.Alpha != other.Alpha:
+			raise ValueError("Merging stats with different sketch accuracy (%f and %f)" % (self.Alpha, other.Alpha))
+
+		ret = StatBot(keep=self.Keep and other.Keep, alpha=self.Alpha)
+		for o in (self, other):
+			if not o.Length:
+				continue
+
+			ret.Length += o.Length
+			ret.Sum += o.Sum
+			ret.Minimum = o.Minimum if ret.Minimum is None else min(ret.Minimum, o.Minimum)
+			ret.Maximum = o.Maximum if ret.Maximum is None else max(ret.Maximum, o.Maximum)
+
+			if ret.Keep:
+				ret._Chunks += o._Chunks
+
+			for store,ostore in ((ret._Positive, o._Positive), (ret._Negative, o._Negative)):
+				for k,c in ostore.items():
+					store[k] = store.get(k, 0) + c
+			ret._Zero += o._Zero
+
+		# Both sorted, then a stable sort only has to merge the two runs (linear time)
+		if ret.Keep and self._Sorted is not None and other._Sorted is not None:
+			ret._Sorted = np.sort(np.concatenate((self._Sorted, other._Sorted)), kind='stable')
+
+		return ret
+
+	@property
+	def Data(self):
+		"""
+		All of the data as one array, or None if not kept.
+		"""
+
+		if not self.Keep:
+			return None
+		if len(self._Chunks) > 1:
+			self._Chunks = [np.concatenate(self._Chunks)]
+		return self._Chunks[0] if len(self._Chunks) else np.empty(0)
+
+	@property
+	def Sorted(self):
+		"""
+		All of the data sorted, or None if not kept.
+		"""
+
+		if not self.Keep:
+			return None
+		if self._Sorted is None:
+			self._Sorted = np.sort(self.Data)
+		return self._Sorted
+
+	def _RequireSorted(self):
+		if not self.Keep:
+			raise ValueError("Data is not kept, which this needs (only estimated quantiles are available)")
+		return self.Sorted
+
+	def Quantile(self, q):
+		"""
+		Get quantile(s) @q (0 to 1) of the data, exact if the data is kept and estimated from the sketch otherwise.
+		Returns None if there's no data.
+		"""
+
+		if self.Length == 0:
+			return None
+
+		if self.Keep:
+			# Linear interpolation between the closest ranks, same as numpy.quantile
+			s = self.Sorted
+			h = (len(s)-1) * np.asarray(q, dtype=np.float64)
+			lo = np.floor(h).astype(np.intp)
+			hi = np.minimum(lo+1, len(s)-1)
+			t = h - lo
+
+			a = s[lo]
+			b = s[hi]
+			diff = b - a
+			return np.where(t >= 0.5, b - diff*(1-t), a + diff*t)[()]
+
+		# Representative value of each bucket in order from lowest to highest
+		pos = np.sort(np.fromiter(self._Positive.keys(), dtype=np.int64, count=len(self._Positive)))
+		neg = np.sort(np.fromiter(self._Negative.keys(), dtype=np.int64, count=len(self._Negative)))[::-1]
+		values = np.concatenate((
+			-2*self.Gamma**neg/(self.Gamma+1),
+			[0.0] * (self._Zero > 0),
+			2*self.Gamma**pos/(self.Gamma+1),
+		))
+		counts = np.concatenate((
+			[self._Negative[_] for _ in neg.tolist()],
+			[self._Zero] * (self._Zero > 0),
+			[self._Positive[_] for _ in pos.tolist()],
+		))
+
+		# Bucket that has the value of rank q*(N-1)
+		idx = np.searchsorted(np.cumsum(counts), np.asarray(q) * (self.Length-1), side='right')
+		return np.clip(values[idx], self.Minimum, self.Maximum)
+
+	def Percentile(self, p):
+		"""
+		Get percentile(s) @p (0 to 100) of the data (see Quantile).
+		"""
+
+		return self.Quantile(np.asarray(p) / 100.0)
+
+	def TrimmedMean(self, proportion):
+		"""
+		Get the mean of the data with @proportion (0 to 0.5) of the data cut off of each end (same as scipy.stats.trim_mean).
+		Requires the data to be kept. Returns None if there's no data.
+		"""
+
+		s = self._RequireSorted()
+		if not 0 <= proportion < 0.5:
+			raise ValueError("Proportion to trim must be from 0 to 0.5: %s" % proportion)
 		if self.Length == 0:
-			self.Minimum = None
-			self.Maximum = None
-			self.MinMax = None
-			self.Span = None
-
-			self.Mean = None
-			self.Quartile25 = None
-			self.Median = None
-			self.Quartile75 = None
-			self.IQR = None
+			return None
+
+		if self._Prefix is None:
+			self._Prefix = np.concatenate(([0], np.cumsum(s, dtype=np.float64)))
+
+		k = int(proportion * len(s))
+		return (self._Prefix[len(s)-k] - self._Prefix[k]) / (len(s) - 2*k)
+
+	def Histogram(self, bins=10, range=None):
+		"""
+		Get a histogram of the data as (counts, bin edges), same as numpy.histogram.
+		@bins is the number of equal width bins across @range (minimum to maximum if None) or the bin edges.
+		Requires the data to be kept.
+		"""
+
+		s = self._RequireSorted()
+		if np.ndim(bins) == 0:
+			if range is None:
+				range = (self.Minimum, self.Maximum) if self.Length else (0, 1)
+			edges = np.histogram_bin_edges([], bins=bins, range=range)
 		else:
-			self.Minimum = min(self.Data)
-			self.Maximum = max(self.Data)
-			self.MinMax = (self.Minimum, self.Maximum)
-			self.Span = self.Maximum - self.Minimum
-			self.Mean = self.Sum / self.Length
-
-			q = np.quantile(self.Data, [0.25,0.5,0.75,0.90,0.95,0.99])
-			self.Quartile25 = q[0]
-			self.Median = q[1]
-			self.Quartile75 = q[2]
-			self.Percentile90 = q[3]
-			self.Percentile95 = q[4]
-			self.Percentile99 = q[5]
-			self.IQR = q[2]-q[0]
+			edges = np.asarray(bins)
+
+		# Last bin includes its right edge
+		idx = np.concatenate((np.searchsorted(s, edges[:-1], side='left'), np.searchsorted(s, edges[-1:], side='right')))
+		return np.diff(idx), edges
+
+	def CDF(self, x):
+		"""
+		Get the fraction of the data that is less than or equal to @x.
+		Requires the data to be kept. Returns None if there's no data.
+		"""
+
+		s = self._RequireSorted()
+		if self.Length == 0:
+			return None
+		return np.searchsorted(s, x, side='right') / len(s)
+
+	def Bootstrap(self, n=1000, stats=('Mean', 'Median'), confidence=0.95, chunk=None, seed=None):
+		"""
+		Get bootstrap confidence intervals of @stats by resampling the data (with replacement) @n times.
+		@stats are names of attributes (eg, 'Mean', 'Median', 'Quartile25', 'IQR', 'Percentile95') or functions
+		 that take a 2-D array of resamples (one per row) and return the statistic of each row.
+		Resamples are made @chunk at a time (to keep memory to about a million values if None).
+		Set @seed for reproducible results, same @seed gives the same results regardless of @chunk.
+		Requires the data to be kept.
+		Returns a dictionary of each of @stats to (value, low, high) of the @confidence interval, or None if there's no data.
+		"""
+
+		data = self._RequireSorted()
+		if self.Length == 0:
+			return None
+
+		# Statistic of each row of a 2-D array
+		quantiles = dict(zip(['Quartile25', 'Median', 'Quartile75', 'Percentile90', 'Percentile95', 'Percentile99'], self.Quantiles))
+		funcs = []
+		for stat in stats:
+			if callable(stat):
+				funcs.append(stat)
+			elif stat == 'Mean':
+				funcs.append(lambda _: _.mean(axis=1))
+			elif stat in quantiles:
+				funcs.append(functools.partial(lambda q,_: np.quantile(_, q, axis=1), quantiles[stat]))
+			elif stat == 'IQR':
+				funcs.append(lambda _: np.subtract(*np.quantile(_, [0.75,0.25], axis=1)))
+			else:
+				raise ValueError("Unrecognized statistic to bootstrap: %s" % stat)
+
+		if chunk is None:
+			chunk = max(1, 2**20 // len(data))
+
+		rng = np.random.default_rng(seed)
+		dist = np.empty( (len(funcs), n) )
+		for start in range(0, n, chunk):
+			cnt = min(chunk, n-start)
+			resamples = data[rng.integers(0, len(data), size=(cnt, len(data)))]
+			for i,func in enumerate(funcs):
+				dist[i, start:start+cnt] = func(resamples)
+
+		alpha = (1-confidence)/2
+		ret = {}
+		for i,stat in enumerate(stats):
+			value = funcs[i](data[np.newaxis,:])[0]
+			low,high = np.quantile(dist[i], [alpha, 1-alpha])
+			ret[stat] = (value, low, high)
+
+		return ret
+
+	def _Quantiles(self, idx):
+		if self.Length == 0:
+			return None
+		if self._Q is None:
+			self._Q = self.Quantile(self.Quantiles)
+		return self._Q[idx]
+
+	MinMax = property(lambda self: None if self.Length == 0 else (self.Minimum, self.Maximum))
+	Span = property(lambda self: None if self.Length == 0 else self.Maximum - self.Minimum)
+	Mean = property(lambda self: None if self.Length == 0 else self.Sum / self.Length)
+
+	Quartile25 = property(lambda self: self._Quantiles(0))
+	Median = property(lambda self: self._Quantiles(1))
+	Quartile75 = property(lambda self: self._Quantiles(2))
+	Percentile90 = property(lambda self: self._Quantiles(3))
+	Percentile95 = property(lambda self: self._Quantiles(4))
+	Percentile99 = property(lambda self: self._Quantiles(5))
+	IQR = property(lambda self: None if self.Length == 0 else self._Quantiles(2) - self._Quantiles(0))
 
 class TimeData:
 	"""
@@ -62,6 +435,14 @@ class TimeData:
 		self.IsComplete = False
 		self.IsProcessed = False
 
+		# Incremented whenever cycles change (not when they are only checked again)
+		self.Version = 0
+
+		# Cycles compiled into microseconds of the day for searching (see _Compile)
+		self.starts = []
+		self.ends = []
+		self.phases = []
+
 	def AddLightPhase(self, start, end):
 		"""
 		Add a light phase from @start to @end.
@@ -76,6 +457,7 @@ class TimeData:
 			self.cycles.append( (datetime.time.min, end, 'light') )
 			self.cycles.append( (start, datetime.time.max, 'light') )
 
+		self.Version += 1
 		self._Process()
 
 	def AddDarkPhase(self, start, end):
@@ -92,6 +474,7 @@ class TimeData:
 			self.cycles.append( (datetime.time.min, end, 'dark') )
 			self.cycles.append( (start, datetime.time.max, 'dark') )
 
+		self.Version += 1
 		self._Process()
 
 	def _Process(self):
@@ -105,6 +488,7 @@ class TimeData:
 			return
 
 		self.cycles.sort()
+		self._Compile()
 
 		if self.cycles[0][0] != datetime.time.min:
 			return
@@ -136,20 +520,53 @@ class TimeData:
 
 		self.IsProcessed = True
 
+	@staticmethod
+	def _Microseconds(t):
+		"""
+		Convert time @t to microseconds since midnight.
+		"""
+		return ((t.hour*60 + t.minute)*60 + t.second)*1000000 + t.microsecond
+
+	def _Compile(self):
+		"""
+		Compile the sorted cycles into start and end microseconds of the day so a time can be found by bisecting.
+		"""
+		self.starts = [self._Microseconds(_[0]) for _ in self.cycles]
+		self.ends = [self._Microseconds(_[1]) for _ in self.cycles]
+		self.phases = [_[2] for _ in self.cycles]
+
 	def GetTime(self, dt):
 		if isinstance(dt, datetime.datetime):
 			dt = dt.time()
 		elif isinstance(dt, datetime.time):
 			pass
 		else:
-			raise TypeError("Expect datetime or time object, got %d instead" % str(dt))
+			raise TypeError("Expect datetime or time object, got %s instead" % str(dt))
 
-		for start,end,phase in self.cycles:
-			if start <= dt and dt < end:
-				return phase
-		else:
+		# Last cycle starting at or before the time
+		us = self._Microseconds(dt)
+		idx = bisect.bisect_right(self.starts, us) - 1
+		if idx < 0 or us >= self.ends[idx]:
 			raise ValueError("Found time %s not in time data, which shouldn't happen" % str(dt))
 
+		return self.phases[idx]
+
+	def GetTimes(self, dts):
+		"""
+		Get the phase of every time in @dts (an array of datetime64 or datetime objects) at once.
+		Returns an array of phase strings.
+		"""
+
+		dts = np.asarray(dts, dtype='datetime64[us]')
+		us = (dts - dts.astype('datetime64[D]')).astype(np.int64)
+
+		idx = np.searchsorted(self.starts, us, side='right') - 1
+		bad = (idx < 0) | (us >= np.asarray(self.ends, dtype=np.int64)[np.maximum(idx, 0)])
+		if bad.any():
+			raise ValueError("Found time %s not in time data, which shouldn't happen" % dts[bad][0])
+
+		return np.asarray(self.phases)[idx]
+
 class VolumeData:
 	"""
 	Manages volume data.
@@ -158,6 +575,8 @@ class VolumeData:
 
 	Accepted for measured and fill data to be at the same time, so a 1 microsecond delta is added to the measured time
 	 so that fill comes second when sorting.
+
+	Entries are only sorted and indexed when first needed after adding data, so adding many entries is not quadratic.
 	"""
 	def __init__(self):
 		# Tuples of (datetime, code, device ID, left, right)
@@ -166,13 +585,54 @@ class VolumeData:
 		self.fill = []
 		self.process = []
 
+		# Per device index of the processed entries for searching by time (see _Index)
+		self.index = {}
+
+		# True if data has been added since last processed
+		self.IsDirty = False
+
+		# Incremented whenever data is added
+		self.Version = 0
+
+	@classmethod
+	def FromRecords(cls, records):
+		"""
+		Create volume data from an iterable of (datetime, code, device ID, left, right) @records (see AddMany).
+		"""
+		o = cls()
+		o.AddMany(records)
+		return o
+
+	@classmethod
+	def FromFile(cls, fname):
+		"""
+		Create volume data from a CSV or Excel (.xlsx) file @fname.
+		First row is a header and the columns are datetime, code, device ID, left, right.
+		Code is measure or fill (or just m or f), and leave left or right blank if not measured or filled.
+		"""
+
+		if os.path.splitext(fname)[1].lower() in ('.xlsx', '.xlsm'):
+			df = pd.read_excel(fname, usecols=range(5))
+		else:
+			df = pd.read_csv(fname, usecols=range(5), skipinitialspace=True)
+		df = df.dropna(how='all')
+
+		dts = pd.to_datetime(df.iloc[:,0]).dt.to_pydatetime()
+		codes = df.iloc[:,1].astype(str).str.strip().str[0].str.lower()
+		devices = df.iloc[:,2].astype(int)
+		lefts = df.iloc[:,3].astype(object).where(df.iloc[:,3].notna(), None)
+		rights = df.iloc[:,4].astype(object).where(df.iloc[:,4].notna(), None)
+
+		return cls.FromRecords(zip(dts, codes, devices, lefts, rights))
+
 	def AddMeasurement(self, dt, device, left, right):
 		"""
 		Add a measurement value at time @dt for device @device for the left and right tubes.
 		Left and right to be assumed to be milliliters.
 		"""
 		self.measured.append( (dt, 'm', device, left, right) )
-		self._Process()
+		self.IsDirty = True
+		self.Version += 1
 
 	def AddFill(self, dt, device, left, right):
 		"""
@@ -180,11 +640,29 @@ class VolumeData:
 		Left and right to be assumed to be milliliters.
 		"""
 		self.fill.append( (dt + datetime.timedelta(microseconds=1), 'f', device, left, right) )
-		self._Process()
+		self.IsDirty = True
+		self.Version += 1
+
+	def AddMany(self, records):
+		"""
+		Add many measurement and fill values at once from an iterable of (datetime, code, device ID, left, right) @records.
+		Code is 'm' for measurement (see AddMeasurement) or 'f' for fill (see AddFill).
+		"""
+
+		for dt, code, device, left, right in records:
+			if code == 'm':
+				self.measured.append( (dt, 'm', device, left, right) )
+			elif code == 'f':
+				self.fill.append( (dt + datetime.timedelta(microseconds=1), 'f', device, left, right) )
+			else:
+				raise ValueError("Unrecognized volume code '%s', expected 'm' or 'f'" % code)
+
+		self.IsDirty = True
+		self.Version += 1
 
 	def _Process(self):
 		"""
-		Internal function called with every addition of data.
+		Internal function called when data is needed after adding data.
 		Process the entries and collapse measured/fill data.
 		"""
 
@@ -196,6 +674,38 @@ class VolumeData:
 		self.process += self.fill
 		self.process.sort()
 
+		# Group by device (in the sorted order) to index
+		bydevice = {}
+		for entry in self.process:
+			bydevice.setdefault(entry[2], []).append(entry)
+
+		self.index.clear()
+		for device, entries in bydevice.items():
+			self.index[device] = self._Index(entries)
+
+		self.IsDirty = False
+
+	@staticmethod
+	def _Index(entries):
+		"""
+		Index sorted @entries for a single device into arrays.
+		The last_left and last_right arrays are the index of the most recent entry (at or before each entry)
+		 that has a left or right value, or -1 if there isn't one.
+		"""
+
+		left = np.array([np.nan if _[3] is None else _[3] for _ in entries], dtype=np.float64)
+		right = np.array([np.nan if _[4] is None else _[4] for _ in entries], dtype=np.float64)
+		pos = np.arange(len(entries))
+
+		return {
+			'entries': entries,
+			'dt': np.array([_[0] for _ in entries], dtype='datetime64[us]'),
+			'left': left,
+			'right': right,
+			'last_left': np.maximum.accumulate(np.where(np.isnan(left), -1, pos)),
+			'last_right': np.maximum.accumulate(np.where(np.isnan(right), -1, pos)),
+		}
+
 	def GetVolume(self, dt, device):
 		"""
 		Get volume information on device @device at the time @dt.
@@ -206,51 +716,114 @@ class VolumeData:
 		if not len(self.measured):
 			raise ValueError("No volume data")
 
-		# Exclude all other devices
-		filtered = [_ for _ in self.process if _[2] == device]
-
-		# Find bound entires of the time
-		for idx,entry in enumerate(filtered):
-			if dt < entry[0]:
-				if idx == 0:
-					raise ValueError("Time requested (%s) is before all available data, cannot give a volume" % dt)
-				else:
-					for lidx in range(0,idx):
-						pre_l = filtered[idx-lidx]
-						if pre_l[3] is not None:
-							break
-					else:
-						raise ValueError("Unable to find a prior left value starting at index %d" % idx)
+		if self.IsDirty:
+			self._Process()
 
-					for ridx in range(0,idx):
-						pre_r = filtered[idx-ridx]
-						if pre_r[4] is not None:
-							break
-					else:
-						raise ValueError("Unable to find a prior right value starting at index %d" % idx)
-
-					post = entry
-
-					return {
-						# This should be a unique index per device but is meaningless to compare before/after adding data
-						'index': idx,
-						# Pre and post (datetime, left, right)
-						'pre': (pre_l[0], pre_l[3], pre_r[4]),
-						'post': (post[0], post[3], post[4]),
-						# Change in time and volumes of this time span
-						'delta': (post[0]-pre_l[0], pre_l[3]-post[3], pre_r[4]-post[4])
-					}
-			else:
-				# Haven't bounded yet, loop again
-				pass
-		else:
+		# Exclude all other devices
+		if device not in self.index:
+			raise ValueError("Time requested (%s) is after all available data, cannot give a volume" % dt)
+		index = self.index[device]
+		filtered = index['entries']
+
+		# Find bound entires of the time (first entry after @dt)
+		idx = int(np.searchsorted(index['dt'], np.datetime64(dt, 'us'), side='right'))
+		if idx == 0:
+			raise ValueError("Time requested (%s) is before all available data, cannot give a volume" % dt)
+		elif idx == len(filtered):
 			# After last entry
 			raise ValueError("Time requested (%s) is after all available data, cannot give a volume" % dt)
 
+		# Prior values are searched from the bounding entry back to (but not including) the first entry
+		if index['last_left'][idx] < 1:
+			raise ValueError("Unable to find a prior left value starting at index %d" % idx)
+		if index['last_right'][idx] < 1:
+			raise ValueError("Unable to find a prior right value starting at index %d" % idx)
+
+		pre_l = filtered[ index['last_left'][idx] ]
+		pre_r = filtered[ index['last_right'][idx] ]
+		post = filtered[idx]
+
+		# No change in volume can be had if the bounding entry doesn't have both (eg, fill of only one side)
+		if post[3] is None or post[4] is None:
+			raise ValueError("Bounding entry (%s) of time requested (%s) doesn't have both left and right volumes" % (post[0], dt))
+
+		return {
+			# This should be a unique index per device but is meaningless to compare before/after adding data
+			'index': idx,
+			# Pre and post (datetime, left, right)
+			'pre': (pre_l[0], pre_l[3], pre_r[4]),
+			'post': (post[0], post[3], post[4]),
+			# Change in time and volumes of this time span
+			'delta': (post[0]-pre_l[0], pre_l[3]-post[3], pre_r[4]-post[4])
+		}
+
+	def GetVolumes(self, dts, device):
+		"""
+		Get volume information on device @device for every time in @dts (an array of datetime64 or datetime objects) at once.
+		Returns the same dictionary as GetVolume but with arrays in place of each value (volumes are floats with None as NaN),
+		 plus 'valid' as a boolean array of which times have volume information.
+		Where GetVolume would raise ValueError for a time, 'valid' is False, index is -1, and the values are NaT/NaN.
+		"""
+
+		if not len(self.measured):
+			raise ValueError("No volume data")
+
+		if self.IsDirty:
+			self._Process()
+
+		dts = np.asarray(dts, dtype='datetime64[us]')
+		n = len(dts)
+
+		ret = {
+			'valid': np.zeros(n, dtype=bool),
+			'index': np.full(n, -1, dtype=np.int64),
+			'pre': (np.full(n, 'NaT', dtype='datetime64[us]'), np.full(n, np.nan), np.full(n, np.nan)),
+			'post': (np.full(n, 'NaT', dtype='datetime64[us]'), np.full(n, np.nan), np.full(n, np.nan)),
+			'delta': (np.full(n, 'NaT', dtype='timedelta64[us]'), np.full(n, np.nan), np.full(n, np.nan)),
+		}
+
+		if device not in self.index:
+			return ret
+		index = self.index[device]
+
+		# Same bounds as GetVolume
+		idx = np.searchsorted(index['dt'], dts, side='right')
+		valid = (idx > 0) & (idx < len(index['dt']))
+		idx = idx[valid]
+
+		pre_l = index['last_left'][idx]
+		pre_r = index['last_right'][idx]
+		found = (pre_l >= 1) & (pre_r >= 1) & ~np.isnan(index['left'][idx]) & ~np.isnan(index['right'][idx])
+		valid[valid] = found
+		idx, pre_l, pre_r = idx[found], pre_l[found], pre_r[found]
+
+		ret['valid'] = valid
+		ret['index'][valid] = idx
+
+		ret['pre'][0][valid] = index['dt'][pre_l]
+		ret['pre'][1][valid] = index['left'][pre_l]
+		ret['pre'][2][valid] = index['right'][pre_r]
+
+		ret['post'][0][valid] = index['dt'][idx]
+		ret['post'][1][valid] = index['left'][idx]
+		ret['post'][2][valid] = index['right'][idx]
+
+		ret['delta'][0][valid] = ret['post'][0][valid] - ret['pre'][0][valid]
+		ret['delta'][1][valid] = ret['pre'][1][valid] - ret['post'][1][valid]
+		ret['delta'][2][valid] = ret['pre'][2][valid] - ret['post'][2][valid]
+
+		return ret
+
 class CreedLickometer:
-	def __init__(self, fname):
+	def __init__(self, fname, cache=False):
 		self.Filename = fname
 
+		# If True, keep a binary sidecar of the loaded transitions next to the data file to reuse on later loads
+		self.Cache = cache
+
+		# Byte offset into the data file that Update has parsed up to
+		self.Offset = None
+
 		# No volume data by default
 		self.VolumeData = None
 
@@ -260,35 +833,15 @@ class CreedLickometer:
 		# Integer of the programmed device ID
 		self.DeviceID = None
 
-		# Tuples of (minimum,maximum) values for datetime and milliseconds values
-		self.Spandt = None
-		self.Spanms = None
-
-		# Raw data of (datetime, milliseconds integer, Beam open, delta)
+		# Raw data (as Transitions) of (datetime, milliseconds integer, Beam open, delta)
 		# where Beam open is True == beam opened, False == beam closed
 		# and delta == change from prior state (either a bout time or interbout time)
 		self.Lefts = None
 		self.Rights = None
 
-		# List of bout deltas
-		self.LeftBouts = None
-		self.RightBouts = None
-
-		# List of intebout deltas
-		self.LeftInterbouts = None
-		self.RightInterbouts = None
-
-		# Dictionary mapping datetime by minute to bout deltas
-		self.LeftVsTime = None
-		self.RightVsTime = None
-
-		# Cumulative data
-		self.LeftCumulative = None
-		self.RightCumulative = None
-
-		# Cumulative volume data (total)
-		self.LeftCumulativeTotalVolume = None
-		self.RightCumulativeTotalVolume = None
+		# Derived products (bouts, stats, etc. see properties below) made from the above and _Stamp() of what they were made from
+		self._Cache = {}
+		self._CacheStamp = None
 
 		self.IsMerged = False
 		self.IsLoaded = False
@@ -311,10 +864,6 @@ class CreedLickometer:
 		"""
 		self.VolumeData = volume
 
-		# Reprocess if volume data is set
-		if self.IsProcessed:
-			self.Process()
-
 	def __repr__(self):
 		return "<%s device=%s file=%s>" % (self.__class__.__name__, self.DeviceID, self.Filename)
 
@@ -393,330 +942,629 @@ class CreedLickometer:
 			for row in rows:
 				w.writerow(row)
 
-	def Load(self):
+	@staticmethod
+	def _ReadColumns(f, chunksize=None):
 		"""
-		Load a CSV data file without processing
+		Read the CSV data in @f (file name or file-like object) into columns.
+		Yields a tuple of (datetime64 array, milliseconds, device ID, left state, right state) arrays for every @chunksize rows,
+		 or just once for the whole file if @chunksize is None.
 		"""
 
-		lefts = []
-		rights = []
-
-		with open(self.Filename, 'r') as f:
-			r = csv.reader(f)
-			for row in r:
-				# Header row, disregard
-				if row[0].startswith("YYYY"):
-					continue
-
+		# Only the first five columns are used (battery voltage and anything after is disregarded)
+		reader = pd.read_csv(f, header=None, usecols=range(5), dtype=str, skipinitialspace=True, chunksize=chunksize)
+		if chunksize is None:
+			reader = [reader]
+
+		fmts = None
+		for df in reader:
+			# Header row(s), disregard
+			df = df[~df[0].str.startswith("YYYY")]
+			if not len(df):
+				continue
+
+			# Detect the timestamp format once from the first row rather than for every row
+			if fmts is None:
+				fmts = ['%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S']
 				try:
-					dt = datetime.datetime.strptime(row[0], '%m/%d/%Y %H:%M')
+					datetime.datetime.strptime(df[0].iloc[0], fmts[0])
 				except ValueError:
-					dt = datetime.datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S')
+					fmts.reverse()
+
+			dts = pd.to_datetime(df[0], format=fmts[0], errors='coerce')
+			# Files shouldn't mix formats, but fall back to the other format for any rows that didn't parse
+			bad = dts.isna()
+			if bad.any():
+				dts[bad] = pd.to_datetime(df[0][bad], format=fmts[1])
+
+			yield (
+				dts.to_numpy(dtype='datetime64[us]'),
+				df[1].to_numpy(dtype=np.int64),
+				df[2].to_numpy(dtype=np.int64),
+				df[3].to_numpy(dtype=np.int64),
+				df[4].to_numpy(dtype=np.int64),
+			)
+
+	@staticmethod
+	def _FindTransitions(dts, mss, state, prior=None):
+		"""
+		Find the beam transitions in @state (1 == beam open, 0 == beam closed).
+		@prior is the (Beam open, milliseconds) of the last transition before these rows, or None if the first row
+		 is taken as the starting beam open transition.
+		Returns a Transitions of (datetime, milliseconds integer, Beam open, delta).
+		"""
 
-				ms = int(row[1])
-				self.DeviceID = int(row[2])
-				left = int(row[3])
-				right = int(row[4])
+		# Scenarios:
+		#  1) Beam open (False) and still is open (1)
+		#  2) Beam open (False) and is closed (0) [MOUSE STARTS DRINKING]
+		#  3) Beam closed (True) and is open (1) [MOUSE STOPS DRINKING]
+		#  4) Beam closed (True) and still is closed (0)
+		# Only (2) and (3) are transitions, which is any row where the state differs from the prior row
+		beam = state == 0
+		if prior is None:
+			idx = np.flatnonzero(beam[1:] != beam[:-1]) + 1
+			idx = np.concatenate(([0], idx))
+
+			ms = mss[idx]
+			# Change from the prior transition (first has no prior)
+			delta = np.concatenate(([Transitions.NoDelta], np.diff(ms)))
+		else:
+			idx = np.flatnonzero(beam != np.concatenate(([prior[0]], beam[:-1])))
 
-				if not len(lefts) and not len(rights):
-					if left == 1 and right == 1:
-						lefts.append( (dt,ms,False,None) )
-						rights.append( (dt,ms,False,None) )
-					else:
-						# Need to find a (1,1) row indicating neither are blocked
-						continue
-				else:
-					# Scenarios:
-					#  1) Beam open (False) and still is open (1)
-					#  2) Beam open (False) and is closed (0) [MOUSE STARTS DRINKING]
-					#  3) Beam closed (True) and is open (1) [MOUSE STOPS DRINKING]
-					#  4) Beam closed (True) and still is closed (0)
-
-					# (2)
-					if lefts[-1][2] == False and left == 0:
-						delta = ms - lefts[-1][1]
-						lefts.append( (dt,ms,True, delta) )
-
-					# (3)
-					elif lefts[-1][2] == True and left == 1:
-						delta = ms - lefts[-1][1]
-						lefts.append( (dt,ms,False, delta) )
-					else:
-						pass
+			ms = mss[idx]
+			delta = np.diff(np.concatenate(([prior[1]], ms)))
 
-					# (2)
-					if rights[-1][2] == False and right == 0:
-						delta = ms - rights[-1][1]
-						rights.append( (dt,ms,True, delta) )
+		return Transitions.FromColumns(dts[idx], ms, beam[idx], delta)
 
-					# (3)
-					elif rights[-1][2] == True and right == 1:
-						delta = ms - rights[-1][1]
-						rights.append( (dt,ms,False, delta) )
-					else:
-						pass
+	def IterTransitions(self, chunksize=65536):
+		"""
+		Load the CSV data file @chunksize rows at a time, yielding (lefts, rights) Transitions for each chunk.
+		Only one chunk is held in memory at a time and Lefts/Rights are not set.
+		Set @chunksize to None to read the whole file as one chunk.
+		"""
 
-		self.Lefts = lefts
-		self.Rights = rights
-		self.IsLoaded = True
+		return self._IterTransitions(self._ReadColumns(self.Filename, chunksize))
 
-	def TrimBefore(self, truncate_dt):
+	def _IterTransitions(self, columns, lprior=None, rprior=None):
 		"""
-		Trim all data before datetime @truncate_dt.
+		Find transitions in each set of @columns from _ReadColumns, yielding (lefts, rights) Transitions for each.
+		@lprior and @rprior are the (Beam open, milliseconds) of the last left and right transitions already found,
+		 or None to start by finding a (1,1) row.
 		"""
 
-		if not self.IsLoaded:
-			self.Load()
+		for dts, mss, devices, left, right in columns:
+			self.DeviceID = int(devices[-1])
 
-		# Pull out trimmed entries
-		lefts = []
-		rights = []
+			if lprior is None:
+				# Need to find a (1,1) row indicating neither are blocked
+				start = np.flatnonzero((left == 1) & (right == 1))
+				if not len(start):
+					continue
 
-		for dt,ms,beam,delta in self.Lefts:
-			if dt >= truncate_dt:
-				lefts.append( (dt,ms,beam,delta) )
-		for dt,ms,beam,delta in self.Rights:
-			if dt >= truncate_dt:
-				rights.append( (dt,ms,beam,delta) )
+				start = start[0]
+				dts, mss, left, right = dts[start:], mss[start:], left[start:], right[start:]
 
-		# Edge case of the truncation date being in the middle of a bout
-		# If it starts in the beam broken state ([2] == True) then exclude it
-		if lefts[0][2]:
-			del lefts[0]
-		if rights[0][2]:
-			del rights[0]
+			lefts = self._FindTransitions(dts, mss, left, lprior)
+			rights = self._FindTransitions(dts, mss, right, rprior)
 
-		# Create new container for the data, assign it, and pretend it's loaded
-		o = CreedLickometer(None)
-		o.DeviceID = self.DeviceID
-		o.VolumeData = self.VolumeData
-		o.TimeData = self.TimeData
-		o.Lefts = lefts
-		o.Rights = rights
-		o.IsLoaded = True
-		o.IsMerged = True
+			# Carry the last transition of each side into the next chunk
+			if len(lefts):
+				lprior = (lefts.Data['beam'][-1], lefts.Data['ms'][-1])
+			if len(rights):
+				rprior = (rights.Data['beam'][-1], rights.Data['ms'][-1])
 
-		return o
+			yield lefts, rights
 
-	def TrimAfter(self, truncate_dt):
+	@staticmethod
+	def _PairBouts(entries):
 		"""
-		Trim all data after datetime @truncate_dt.
+		Pair up beam closed transitions with the beam open transition that follows in @entries.
+		Returns a pandas DataFrame of start_dt, start_ms, end_dt, end_ms, and delta (the bout time).
 		"""
 
-		if not self.IsLoaded:
-			self.Load()
+		data = entries.Data
+		# Beam open following a beam closed (an open following an open is the join point of merged files)
+		idx = np.flatnonzero(~data['beam'][1:] & data['beam'][:-1]) + 1
 
-		# Pull out trimmed entries
-		lefts = []
-		rights = []
+		return pd.DataFrame({
+			'start_dt': data['dt'][idx-1],
+			'start_ms': data['ms'][idx-1],
+			'end_dt': data['dt'][idx],
+			'end_ms': data['ms'][idx],
+			'delta': data['ms'][idx] - data['ms'][idx-1],
+		})
 
-		for dt,ms,beam,delta in self.Lefts:
-			if dt <= truncate_dt:
-				lefts.append( (dt,ms,beam,delta) )
-		for dt,ms,beam,delta in self.Rights:
-			if dt <= truncate_dt:
-				rights.append( (dt,ms,beam,delta) )
+	def IterBouts(self, chunksize=65536):
+		"""
+		Load the CSV data file @chunksize rows at a time, yielding (left, right) DataFrames of the bouts completed in each chunk.
+		See _PairBouts for the columns. Volume and time data are not applied.
+		"""
 
-		# Edge case of the truncation date being in the middle of a bout
-		# If it starts in the beam broken state ([2] == True) then exclude it
-		if lefts[-1][2]:
-			lefts.pop()
-		if rights[-1][2]:
-			rights.pop()
+		lcarry = rcarry = Transitions()
+		for lefts, rights in self.IterTransitions(chunksize):
+			# A bout started in the prior chunk ends in this one, so keep the last transition around to pair with
+			lefts = Transitions.Concatenate(lcarry, lefts)
+			rights = Transitions.Concatenate(rcarry, rights)
 
-		# Create new container for the data, assign it, and pretend it's loaded
-		o = CreedLickometer(None)
-		o.DeviceID = self.DeviceID
-		o.VolumeData = self.VolumeData
-		o.TimeData = self.TimeData
-		o.Lefts = lefts
-		o.Rights = rights
-		o.IsLoaded = True
-		o.IsMerged = True
+			yield self._PairBouts(lefts), self._PairBouts(rights)
 
-		return o
+			lcarry = lefts[-1:]
+			rcarry = rights[-1:]
 
-	@staticmethod
-	def Merge(a, b):
+	def ProcessStream(self, chunksize=65536):
 		"""
-		Merge two data files @a and @b and return a new CreedLickometer instance
+		Summarize bouts in constant memory by streaming the CSV data file @chunksize rows at a time instead of loading it.
+		Nothing on the object is changed other than DeviceID.
+		Volume and time data are not applied, so bouts without volume data are still counted unlike Process.
+
+		Returns a dictionary with the time spans (Spandt, Spanms) and for each of 'left' and 'right':
+		 'Bouts' and 'Interbouts' StatBots (not keeping the data, so quantiles are estimates),
+		 and 'VsTime' dictionary mapping datetime by minute to the number of bouts.
 		"""
 
-		# Ensure files are loaded
-		if not a.IsLoaded:
-			a.Load()
-		if not b.IsLoaded:
-			b.Load()
-
-		# Ensure files are processed (I'm lazy and don't want to calculate Spandt myself)
-		if not a.IsProcessed:
-			a.Process()
-		if not b.IsProcessed:
-			b.Process()
-
-		# Why would you merge files from different devices other than by accident?
-		if a.DeviceID != b.DeviceID:
-			raise ValueError("Merging files from two different devices (%d and %d)" % (a.DeviceID, b.DeviceID))
-
-		# Ensure same volume data for both data sets
-		if a.VolumeData is None and b.VolumeData is None:
-			pass
-		elif a.VolumeData is not None and b.VolumeData is not None:
-			if id(a.VolumeData) != id(b.VolumeData):
-				raise ValueError("Merging two sets of data with different volume data")
-			else:
-				# Same object, so move on
-				pass
-		else:
-			raise ValueError("Merging two sets of data but one does not have volume data and the other does")
+		ret = {'Spandt': (None,None), 'Spanms': (None,None)}
+		prior = {}
+		for side in ('left', 'right'):
+			ret[side] = {
+				'Bouts': StatBot(keep=False),
+				'Interbouts': StatBot(keep=False),
+				'VsTime': {},
+			}
+			prior[side] = None
+
+		for chunks in self.IterBouts(chunksize):
+			for side, bouts in zip(('left', 'right'), chunks):
+				if not len(bouts):
+					continue
 
-		# Ensure same volume data for both data sets
-		if a.TimeData is None and b.TimeData is None:
-			pass
-		elif a.TimeData is not None and b.TimeData is not None:
-			if id(a.TimeData) != id(b.TimeData):
-				raise ValueError("Merging two sets of data with different time data")
-			else:
-				# Same object, so move on
-				pass
-		else:
-			raise ValueError("Merging two sets of data but one does not have time data and the other does")
+				start_dt = bouts['start_dt'].to_numpy()
+				end_dt = bouts['end_dt'].to_numpy()
 
-		# -----------------------------------------------------------------------------------------
-		# -----------------------------------------------------------------------------------------
+				ret[side]['Bouts'].Update(bouts['delta'].to_numpy())
 
-		# No data, so no need to merge
-		if a.Spandt[0] is None:
-			return b
-		elif b.Spandt[0] is None:
-			return a
-
-		# Flip file order if wrong
-		if b.Spandt[0] >= a.Spandt[1]:
-			# a <= b is correctly ordered as expected
-			pass
-		elif a.Spandt[0] > b.Spandt[1]:
-			# b < a so swap them
-			a,b = b,a
-		else:
-			raise ValueError("Unrecognized ordering of files: a=%s, b=%s" % (a.Spandt, b.Spandt))
-
-		# Time gap between files
-		gap = b.Spandt[0] - a.Spandt[1]
-
-		# Not a halting error, just disregard data we can't finish processing
-		if a.Lefts[-1][2]:
-			print("First file (%s) left ends with beam broken, popping this off" % a.Filename)
-			a.Lefts.pop()
-		if b.Lefts[0][2]:
-			print("Second file (%s) left starts with a beam broken, dequeueing it" % b.Filename)
-			del b.Lefts[0]
-
-		if a.Rights[-1][2]:
-			print("First file (%s) right ends with beam broken, popping this off" % a.Filename)
-			a.Rights.pop()
-		if b.Rights[0][2]:
-			print("Second file (%s) right starts with a beam broken, dequeueing it" % b.Filename)
-			del b.Rights[0]
+				# Interbout from the end of each bout to the start of the next, including the last of the prior chunk
+				if prior[side] is not None:
+					start_prior = np.concatenate(([prior[side]], end_dt[:-1]))
+				else:
+					start_dt, start_prior = start_dt[1:], end_dt[:-1]
+				ret[side]['Interbouts'].Update((start_dt - start_prior) / np.timedelta64(1, 's'))
+				prior[side] = end_dt[-1]
+
+				# Bouts per minute
+				minutes, counts = np.unique(bouts['start_dt'].to_numpy(dtype='datetime64[m]'), return_counts=True)
+				vstime = ret[side]['VsTime']
+				for dt, cnt in zip(minutes.tolist(), counts.tolist()):
+					vstime[dt] = vstime.get(dt, 0) + cnt
+
+				# Expand the spans
+				spans = (
+					(bouts['start_dt'].iloc[0], bouts['end_dt'].max()),
+					(bouts['start_ms'].iloc[0], bouts['end_ms'].max()),
+				)
+				for key, (lo, hi) in zip(('Spandt', 'Spanms'), spans):
+					if ret[key][0] is not None:
+						lo = min(lo, ret[key][0])
+						hi = max(hi, ret[key][1])
+					ret[key] = (lo, hi)
+
+		return ret
+
+	def _CacheIdentity(self):
+		"""
+		Identify the data file by size, modification time, and a hash of the contents.
+		"""
+
+		st = os.stat(self.Filename)
+
+		h = hashlib.blake2b(digest_size=16)
+		with open(self.Filename, 'rb') as f:
+			for block in iter(lambda: f.read(1<<20), b''):
+				h.update(block)
+
+		return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': h.hexdigest()}
+
+	def _LoadCache(self, ident):
+		"""
+		Load transitions from the sidecar cache file if it matches the data file identity @ident.
+		Returns True if loaded, False if there's no cache or it's stale.
+		"""
+
+		try:
+			with np.load(self.Filename + '.npz', allow_pickle=False) as z:
+				for k,v in ident.items():
+					if z[k].item() != v:
+						return False
+
+				deviceid = int(z['deviceid'])
+				self.DeviceID = None if deviceid < 0 else deviceid
+				self.Lefts = Transitions(z['lefts'])
+				self.Rights = Transitions(z['rights'])
+		except (OSError, KeyError, ValueError):
+			return False
+
+		return True
+
+	def _SaveCache(self, ident):
+		"""
+		Save transitions to the sidecar cache file with the data file identity @ident.
+		"""
+
+		# Write to a temporary file and move it over so a partially written cache is never read
+		fname = self.Filename + '.npz'
+		tmpname = self.Filename + '.tmp.npz'
+		np.savez(tmpname,
+			lefts=self.Lefts.Data,
+			rights=self.Rights.Data,
+			deviceid=-1 if self.DeviceID is None else self.DeviceID,
+			**ident)
+		os.replace(tmpname, fname)
+
+	def Load(self):
+		"""
+		Load a CSV data file without processing.
+		If caching is enabled then the sidecar cache file is used if it's current, or rebuilt if not.
+		"""
+
+		if self.Cache:
+			ident = self._CacheIdentity()
+			if self._LoadCache(ident):
+				self.IsLoaded = True
+				return
+
+		lefts = []
+		rights = []
+		for l,r in self.IterTransitions(chunksize=None):
+			lefts.append(l)
+			rights.append(r)
+
+		self.Lefts = Transitions.Concatenate(*lefts) if len(lefts) else Transitions()
+		self.Rights = Transitions.Concatenate(*rights) if len(rights) else Transitions()
+		self.IsLoaded = True
+
+		if self.Cache:
+			self._SaveCache(ident)
+
+	def Update(self):
+		"""
+		Parse only the rows appended to the data file since the last Update and extend Lefts/Rights with them.
+		The first call (or if the file shrank) reads the whole file.
+		Only complete lines are parsed, so a partially written last row is left for the next call.
+		Derived products are made again with the new data when next used.
+		Returns the number of new left and right transitions as a tuple.
+		"""
+
+		if self.Offset is None or os.path.getsize(self.Filename) < self.Offset:
+			self.Offset = 0
+			self.Lefts = Transitions()
+			self.Rights = Transitions()
+
+		with open(self.Filename, 'rb') as f:
+			f.seek(self.Offset)
+			data = f.read()
+
+		end = data.rfind(b'\n') + 1
+		if end == 0:
+			self.IsLoaded = True
+			return (0,0)
+
+		# Resume from the last transitions (if a (1,1) row has been found yet)
+		lprior = rprior = None
+		if len(self.Lefts):
+			lprior = (self.Lefts.Data['beam'][-1], self.Lefts.Data['ms'][-1])
+			rprior = (self.Rights.Data['beam'][-1], self.Rights.Data['ms'][-1])
+
+		columns = self._ReadColumns(io.BytesIO(data[:end]))
+		lefts = [self.Lefts]
+		rights = [self.Rights]
+		for l,r in self._IterTransitions(columns, lprior, rprior):
+			lefts.append(l)
+			rights.append(r)
+
+		self.Offset += end
+		self.Lefts = Transitions.Concatenate(*lefts)
+		self.Rights = Transitions.Concatenate(*rights)
+		self.IsLoaded = True
+
+		return (sum(len(_) for _ in lefts[1:]), sum(len(_) for _ in rights[1:]))
+
+	def TrimBefore(self, truncate_dt):
+		"""
+		Trim all data before datetime @truncate_dt.
+		"""
+
+		return self.Window(truncate_dt, None)
+
+	def TrimAfter(self, truncate_dt):
+		"""
+		Trim all data after datetime @truncate_dt.
+		"""
+
+		return self.Window(None, truncate_dt)
+
+	def Window(self, start, end):
+		"""
+		Cut out the data from datetime @start to datetime @end (inclusive), either can be None to not trim that end.
+		Transitions are binary searched by datetime and the returned CreedLickometer has views of
+		 this one's data, so no copying is done.
+		"""
+
+		if not self.IsLoaded:
+			self.Load()
+
+		slices = []
+		for entries in (self.Lefts, self.Rights):
+			dts = entries.Data['dt']
+
+			lo = 0 if start is None else int(np.searchsorted(dts, np.datetime64(start, 'us'), side='left'))
+			hi = len(dts) if end is None else int(np.searchsorted(dts, np.datetime64(end, 'us'), side='right'))
+			hi = max(lo, hi)
+
+			# Edge case of the truncation date being in the middle of a bout
+			# If it starts in the beam broken state or ends in it then exclude it
+			if start is not None and lo < hi and entries.Data['beam'][lo]:
+				lo += 1
+			if end is not None and lo < hi and entries.Data['beam'][hi-1]:
+				hi -= 1
+
+			slices.append(entries[lo:hi])
+
+		# Create new container for the data, assign it, and pretend it's loaded
+		o = CreedLickometer(None)
+		o.DeviceID = self.DeviceID
+		o.VolumeData = self.VolumeData
+		o.TimeData = self.TimeData
+		o.Lefts, o.Rights = slices
+		o.IsLoaded = True
+		o.IsMerged = True
+
+		return o
+
+	@staticmethod
+	def Merge(a, b, overlap=False):
+		"""
+		Merge two data files @a and @b and return a new CreedLickometer instance
+		See MergeMany for @overlap.
+		"""
+
+		return CreedLickometer.MergeMany([a, b], overlap=overlap)
+
+	@staticmethod
+	def MergeMany(objs, overlap=False):
+		"""
+		Merge many data files @objs of the same device in one pass and return a new CreedLickometer instance.
+		Files are put in time order and the milliseconds of each are offset to follow on from the prior file.
+		Gives the same result as merging them one pair at a time with Merge, but only processes the merged data once.
+		If @overlap is True then files that overlap in time (eg, the SD card was dumped twice) are joined on their
+		 shared rows and the repeated transitions are dropped, otherwise overlapping files are an error.
+		"""
+
+		objs = list(objs)
+		if not len(objs):
+			raise ValueError("No data files to merge")
+
+		# Ensure files are loaded
+		for o in objs:
+			if not o.IsLoaded:
+				o.Load()
+
+		a = objs[0]
+		for b in objs[1:]:
+			# Why would you merge files from different devices other than by accident?
+			if a.DeviceID != b.DeviceID:
+				raise ValueError("Merging files from two different devices (%d and %d)" % (a.DeviceID, b.DeviceID))
+
+			# Ensure same volume data for both data sets
+			if a.VolumeData is None and b.VolumeData is None:
+				pass
+			elif a.VolumeData is not None and b.VolumeData is not None:
+				if id(a.VolumeData) != id(b.VolumeData):
+					raise ValueError("Merging two sets of data with different volume data")
+				else:
+					# Same object, so move on
+					pass
+			else:
+				raise ValueError("Merging two sets of data but one does not have volume data and the other does")
+
+			# Ensure same volume data for both data sets
+			if a.TimeData is None and b.TimeData is None:
+				pass
+			elif a.TimeData is not None and b.TimeData is not None:
+				if id(a.TimeData) != id(b.TimeData):
+					raise ValueError("Merging two sets of data with different time data")
+				else:
+					# Same object, so move on
+					pass
+			else:
+				raise ValueError("Merging two sets of data but one does not have time data and the other does")
+
+		# -----------------------------------------------------------------------------------------
+		# -----------------------------------------------------------------------------------------
+
+		# No data, so no need to merge
+		# (Spandt of each file is made from its own data, which is done once per file)
+		segs = [_ for _ in objs if _.Spandt[0] is not None]
+		if not len(segs):
+			return objs[-1]
+		elif len(segs) == 1:
+			return segs[0]
+
+		# Put files in order
+		segs.sort(key=lambda _:_.Spandt[0])
+
+		# Group files that overlap in time into runs, each run is then treated as a single file
+		runs = [[segs[0]]]
+		end = segs[0].Spandt[1]
+		for b in segs[1:]:
+			if b.Spandt[0] < end:
+				if not overlap:
+					raise ValueError("Unrecognized ordering of files: a=%s, b=%s" % (runs[-1][-1].Spandt, b.Spandt))
+				runs[-1].append(b)
+			else:
+				runs.append([b])
+			end = max(end, b.Spandt[1])
 
 		# -----------------------------------------------------------------------------------------
 		# -----------------------------------------------------------------------------------------
 
-		# Expected gap given gap in seconds
-		gapms = int(gap.total_seconds() * 1000 + 1000)
-		startms = gapms + a.Spanms[1]
-		deltams = startms - b.Spanms[0]
+		lefts = []
+		rights = []
+		prior = None
+		for idx,run in enumerate(runs):
+			if len(run) == 1:
+				first = last = run[0]
+				l = first.Lefts
+				r = first.Rights
+				spandt = first.Spandt
+				spanms = first.Spanms
+			else:
+				# Overlapping files are on the same milliseconds clock, so join them as-is
+				first = run[0]
+				last = max(run, key=lambda _:_.Spandt[1])
+				l,lshared = CreedLickometer._Union([_.Lefts for _ in run])
+				r,rshared = CreedLickometer._Union([_.Rights for _ in run])
+				for f,a,b in zip(run[1:], lshared, rshared):
+					if not (a or b):
+						raise ValueError("Overlapping file (%s) shares no rows with the files before it" % f.Filename)
+				spandt = (first.Spandt[0], last.Spandt[1])
+				spanms = (min(_.Spanms[0] for _ in run), max(_.Spanms[1] for _ in run))
+
+			# Not a halting error, just disregard data we can't finish processing
+			if idx > 0:
+				if len(l) and l[0][2]:
+					print("Second file (%s) left starts with a beam broken, dequeueing it" % first.Filename)
+					l = l[1:]
+				if len(r) and r[0][2]:
+					print("Second file (%s) right starts with a beam broken, dequeueing it" % first.Filename)
+					r = r[1:]
+			if idx < len(runs)-1:
+				if len(l) and l[-1][2]:
+					print("First file (%s) left ends with beam broken, popping this off" % last.Filename)
+					l = l[:-1]
+				if len(r) and r[-1][2]:
+					print("First file (%s) right ends with beam broken, popping this off" % last.Filename)
+					r = r[:-1]
+
+			if prior is None:
+				deltams = 0
+			else:
+				# Time gap between files
+				gap = spandt[0] - prior[0][1]
 
-		# Aggregate lefts & rights together
-		lefts = list(a.Lefts)
-		rights = list(a.Rights)
+				# Expected gap given gap in seconds
+				gapms = int(gap.total_seconds() * 1000 + 1000)
+				startms = gapms + prior[1][1] + deltams
+				deltams = startms - spanms[0]
 
-		# Merge left & right data and adjust @b's milliseconds to account for the gap
-		# This ensures that millseconds is increasing across the merged data sets
-		for dt,ms,beam,delta in b.Lefts:
-			lefts.append( (dt,ms+deltams,beam,delta) )
-		for dt,ms,beam,delta in b.Rights:
-			rights.append( (dt,ms+deltams,beam,delta) )
+			# Adjust milliseconds to account for the gap
+			# This ensures that millseconds is increasing across the merged data sets
+			lefts.append(l.Offset(deltams))
+			rights.append(r.Offset(deltams))
+			prior = (spandt, spanms)
 
 		# Create new container for the data, assign it, and pretend it's loaded
 		o = CreedLickometer(None)
-		o.DeviceID = a.DeviceID
-		o.VolumeData = a.VolumeData
-		o.TimeData = a.TimeData
-		o.Lefts = lefts
-		o.Rights = rights
+		o.DeviceID = segs[0].DeviceID
+		o.VolumeData = segs[0].VolumeData
+		o.TimeData = segs[0].TimeData
+		o.Lefts = Transitions.Concatenate(*lefts)
+		o.Rights = Transitions.Concatenate(*rights)
 		o.IsLoaded = True
 		o.IsMerged = True
 		o.Process()
 
 		return o
 
-	def Process(self, rawdata_fname=None):
+	@staticmethod
+	def _Union(parts):
 		"""
-		Process the raw data in Lefts & Rights into the various parts and data.
-		Pass in a file name via @rawdata_fname to save raw processed data to a file (well, two files one for left and one for right).
+		Join Transitions @parts from overlapping files of the same milliseconds clock, dropping repeated rows.
+		Returns the joined Transitions and, for each of parts[1:], whether it shares any (datetime, milliseconds) row
+		 with the parts before it.
+		"""
+
+		data = parts[0].Data
+		shared = []
+		for part in parts[1:]:
+			# Each is already in order so a stable sort only has to merge two runs (linear time)
+			data = np.concatenate((data, part.Data))
+			data = data[np.argsort(data['ms'], kind='stable')]
+
+			# Shared rows end up next to each other
+			same = (data['ms'][1:] == data['ms'][:-1]) & (data['dt'][1:] == data['dt'][:-1])
+			shared.append(bool(same.any()))
+			data = data[np.concatenate(([True], ~(same & (data['beam'][1:] == data['beam'][:-1]))))]
+
+		# A file starts with a beam open transition that may just continue the prior file's state,
+		#  so only keep actual changes in beam state
+		data = data[np.concatenate(([True], data['beam'][1:] != data['beam'][:-1]))]
+
+		# Change from the prior transition, first keeps whatever it had
+		data = data.copy()
+		data['delta'][1:] = np.diff(data['ms'])
+
+		return Transitions(data), shared
+
+	def _Stamp(self):
+		"""
+		Objects (and their versions) that derived products are made from, used to tell if the cache is stale.
+		"""
+		return [(_, getattr(_, 'Version', None)) for _ in (self.Lefts, self.Rights, self.VolumeData, self.TimeData)]
+
+	def _Derived(self, key, side=None):
+		"""
+		Get derived product @key (for @side of 'Left' or 'Right', or other argument, if applicable) from the cache.
+		If not cached, or Lefts, Rights, VolumeData, or TimeData have changed since cached, then it is made by calling _Make<key>(side).
 		"""
 
 		if not self.IsLoaded:
 			self.Load()
 
-		# Clear everything
-		self.LeftBouts = []
-		self.RightBouts = []
-
-		self.LeftInterbouts = []
-		self.RightInterbouts = []
+		stamp = self._Stamp()
+		if self._CacheStamp is None or any(a[0] is not b[0] or a[1] != b[1] for a,b in zip(stamp, self._CacheStamp)):
+			self._Cache.clear()
+			self._CacheStamp = stamp
 
-		self.LeftVsTime = {}
-		self.RightVsTime = {}
+		if (key,side) not in self._Cache:
+			self._Cache[(key,side)] = getattr(self, '_Make' + key)(side)
 
-		self.LeftCumulative = []
-		self.RightCumulative = []
+		return self._Cache[(key,side)]
 
-		self.LeftCumulativeTotalVolume = []
-		self.RightCumulativeTotalVolume = []
+	def _MakeTables(self, _):
+		"""
+		Make the left and right bout tables (pandas DataFrames) and the time spans they cover.
+		Returns a tuple of (left, right, Spandt, Spanms).
+		"""
 
 		def topandas(pycl, lr_idx, entries, volume_pdf):
-			bouts = []
-			ld_phase_last = None
-			ld_phase_idx = 0
-			for idx,row in enumerate(entries):
-				dt,ms,beam,delta = row
-				if not beam:
-					priorrow = entries[idx-1]
-					# Shouldn't compare
-					if not priorrow[2]:
-						continue
-
-					try:
-						voldat = pycl.VolumeData.GetVolume(dt, self.DeviceID)
-					except ValueError as e:
-						print(['getvolume error', dt, self.DeviceID, e])
-						continue
-					lightdat = pycl.TimeData.GetTime(dt)
-
-					# Calculate a running phase index of light/datk so that it can be grouped
-					if ld_phase_last is None:
-						ld_phase_last = lightdat
-					if lightdat != ld_phase_last:
-						ld_phase_last = lightdat
-						ld_phase_idx += 1
-
-					if voldat['index'] not in volume_pdf:
-						volume_pdf[ voldat['index'] ] = voldat['delta'][1+lr_idx]
-
-					bouts.append({
-						'start_dt': priorrow[0],
-						'start_ms': priorrow[1],
-						'end_dt': dt,
-						'end_ms': ms,
-						'delta': ms - priorrow[1],
-						'volume': voldat['delta'][1+lr_idx],
-						'volume_index': voldat['index'],
-						'light': lightdat == 'light',
-						'light_idx': ld_phase_idx
-					})
-			return pd.DataFrame(bouts)
+			# Pair up beam closed and open transitions into bouts
+			bouts = self._PairBouts(entries)
+			end_dt = bouts['end_dt'].to_numpy(dtype='datetime64[us]')
+
+			# Volume data of every bout at once, dropping those without any
+			voldat = pycl.VolumeData.GetVolumes(end_dt, self.DeviceID)
+			valid = voldat['valid']
+			if not valid.all():
+				missing = end_dt[~valid]
+				print("Device %s has %d bouts without volume data (%s to %s), skipping them" % (self.DeviceID, len(missing), missing.min().item(), missing.max().item()))
+
+			bouts = bouts[valid].reset_index(drop=True)
+			volume = voldat['delta'][1+lr_idx][valid]
+			volume_index = voldat['index'][valid]
+
+			light = pycl.TimeData.GetTimes(end_dt[valid]) == 'light'
+
+			# Calculate a running phase index of light/datk so that it can be grouped
+			light_idx = np.concatenate(([0], np.cumsum(light[1:] != light[:-1])))[:len(light)]
+
+			# Volume of each volume index in order of first appearance
+			_,first = np.unique(volume_index, return_index=True)
+			for idx in np.sort(first):
+				volume_pdf[ int(volume_index[idx]) ] = float(volume[idx])
+
+			bouts['volume'] = volume
+			bouts['volume_index'] = volume_index
+			bouts['light'] = light
+			bouts['light_idx'] = light_idx
+			return bouts
 
 		# Map the volume_index to volume as a "pdf" then cumulative sum those values to make a "cdf"
 		# This can be added to the cumulative_volume at each row to get cumulative_total_volume
@@ -745,53 +1593,33 @@ class CreedLickometer:
 		def o(data, cdf):
 			# Calculate the cumulative sum of the delta (this sums the delta for the entire series)
 			data['delta_total_cdf'] = data['delta'].cumsum()
-			# Best way I found to do this is to copy the volume index first, them map that column using the CDF data generated
-			data['volume_cumulative_base'] = data['volume_index']
-			data['volume_cumulative_base'] = data['volume_cumulative_base'].map(cdf.get)
+			# Map the volume index using the CDF data generated
+			data['volume_cumulative_base'] = data['volume_index'].map(cdf.get)
 
 			grp = data.groupby('volume_index')
 			data['delta_cdf'] = grp['delta'].cumsum()
 
+			# Total bout time of each volume index, broadcast back to each of its rows
+			delta_sum = grp['delta'].transform('sum')
+
 			# Create new columns of data ultimately to get cumulative_volume and cumulative_total_volume
-			def f1(g):
-				g['vol_delta_pdf'] = g['delta'] * g['volume']
-				g['vol_delta_cdf'] = g['delta_cdf'] * g['volume']
-				g['step_volume'] = g['vol_delta_pdf'] / g['delta'].sum()
-				g['cumulative_volume'] = g['vol_delta_cdf'] / g['delta'].sum()
-				g['cumulative_total_volume'] = g['cumulative_volume'] + g['volume_cumulative_base']
-				return g
-
-			# Calculate the other values and back copy into @data (have to do droplevel(0) to reduce index so data can be inserted back into the frame)
-			#   https://stackoverflow.com/questions/20737811/attaching-a-calculated-column-to-an-existing-dataframe-raises-typeerror-incompa
-			g = grp.apply(f1)
-			data['vol_delta_pdf'] = g['vol_delta_pdf']
-			data['vol_delta_cdf'] = g['vol_delta_cdf']
-			data['step_volume'] = g['step_volume']
-			data['cumulative_volume'] = g['cumulative_volume']
-			data['cumulative_total_volume'] = g['cumulative_total_volume']
-
-			# Split up by light phase index and create pdf function (no need for cdf of this)
-			grp = data.groupby('light_idx')
-			def f2(g):
-				g['lightdark_phase_volume_pdf'] = g['step_volume']
-				return g
-
-			y = grp.apply(f2)
-			data['lightdark_phase_volume_pdf'] = y['lightdark_phase_volume_pdf']
+			data['vol_delta_pdf'] = data['delta'] * data['volume']
+			data['vol_delta_cdf'] = data['delta_cdf'] * data['volume']
+			data['step_volume'] = data['vol_delta_pdf'] / delta_sum
+			data['cumulative_volume'] = data['vol_delta_cdf'] / delta_sum
+			data['cumulative_total_volume'] = data['cumulative_volume'] + data['volume_cumulative_base']
+
+			# Light/dark phase pdf is the step volume within each phase (no need for cdf of this)
+			data['lightdark_phase_volume_pdf'] = data['step_volume']
 
 			# No group by light or dark phase to create cdf for each phase over the whole data range
 			grp = data.groupby('light')
 			data['lightdark_phase_total_volume_cdf'] = grp['lightdark_phase_volume_pdf'].cumsum()
 
-			data['light_phase_total_volume_cdf'] = None
-			data['dark_phase_total_volume_cdf'] = None
-
-			# Using a mask of light and dark phase to copy data from lightdark_phase_total_volume_cdf
-			# Eseentially just splits 'lightdark_phase_total_volume_cdf' into two columns
-			mask = data['light'] == True
-			data.loc[mask, 'light_phase_total_volume_cdf'] = data.loc[mask, 'lightdark_phase_total_volume_cdf']
-			mask = data['light'] == False
-			data.loc[mask, 'dark_phase_total_volume_cdf'] = data.loc[mask, 'lightdark_phase_total_volume_cdf']
+			# Eseentially just splits 'lightdark_phase_total_volume_cdf' into two columns by light and dark phase
+			cdf = data['lightdark_phase_total_volume_cdf'].astype(object)
+			data['light_phase_total_volume_cdf'] = cdf.where(data['light'], None)
+			data['dark_phase_total_volume_cdf'] = cdf.where(~data['light'], None)
 
 			return data
 
@@ -819,332 +1647,350 @@ class CreedLickometer:
 
 			right = o(right, right_volume_cdf)
 
-		# Set the spans of the time data
-		self.Spandt = (mindt, maxdt)
-		self.Spanms = (minms, maxms)
+		return left, right, (mindt, maxdt), (minms, maxms)
 
-		# Save if file name is provided
-		if rawdata_fname:
-			fname = '%s-left.csv' % os.path.splitext(rawdata_fname)[0]
-			left.to_csv(fname)
+	def _MakeMinutes(self, _):
+		"""
+		Every minute covered by the data so that zeroes are included for minutes without bouts.
+		"""
 
-			fname = '%s-right.csv' % os.path.splitext(rawdata_fname)[0]
-			right.to_csv(fname)
+		mindt,maxdt = self.Spandt
+		if mindt is None:
+			return np.empty(0, dtype='datetime64[m]')
+		else:
+			# From the minute of the first to the minute of the last, so every bout start falls in one
+			return np.arange(np.datetime64(mindt, 'm'), np.datetime64(maxdt, 'm') + 1)
+
+	def _MakeBouts(self, side):
+		data = self._Derived('Tables')[side == 'Right']
+		if not len(data):
+			return np.empty(0, dtype=np.int64)
+		return data['delta'].to_numpy()
+
+	def _MakeInterbouts(self, side):
+		data = self._Derived('Tables')[side == 'Right']
+		if not len(data):
+			return np.empty(0, dtype=np.float64)
+
+		# Time from the end of each bout to the start of the next
+		start_dt = data['start_dt'].to_numpy()
+		end_dt = data['end_dt'].to_numpy()
+		return (start_dt[1:] - end_dt[:-1]) / np.timedelta64(1, 's')
+
+	def _MakeVsTime(self, side):
+		data = self._Derived('Tables')[side == 'Right']
+		minutes = self._Derived('Minutes')
+		if not len(data):
+			return pd.Series(np.zeros(len(minutes), dtype=np.int64), index=minutes)
+
+		# Count of bouts rounded to the minute
+		offsets = (data['start_dt'].to_numpy(dtype='datetime64[m]') - minutes[0]).astype(np.int64)
+		counts = np.bincount(offsets, minlength=len(minutes))
+		if len(counts) != len(minutes):
+			raise ValueError("%s bouts start outside of the minutes of the data (%s to %s)" % (side, minutes[0], minutes[-1]))
+		return pd.Series(counts, index=minutes)
+
+	def _MakeVsTimeData(self, minutes):
+		"""
+		Regroup the per minute bout counts into bins of @minutes (see VsTimeData).
+		"""
 
-		def genplotdata(data, vstime, cumulative, cumulativetotalvolume, bouts, interbouts):
-			# Generate vstime data rounded to the minute
-			for idx,row in data.iterrows():
-				dt = row['start_dt'].replace(second=0, microsecond=0)
-				if dt not in vstime:
-					vstime[dt] = []
-				vstime[dt].append(row['delta'])
-
-			# Generate bout and interbout data
-			prior = None
-			for idx,row in data.iterrows():
-				#bouts.append( (row['start_dt'], row['delta']) )
-				bouts.append(row['delta'])
-
-				if prior is None:
-					prior = row['end_dt']
-				else:
-					#interbout = (row['start_dt'] - prior).total_seconds()
-					interbout = (row['start_dt'] - prior).total_seconds()
-					interbouts.append(interbout)
-					prior = row['end_dt']
+		minutes_dt = self._Derived('Minutes')
+		left = self.LeftVsTime.to_numpy()
+		right = self.RightVsTime.to_numpy()
+		if not (len(left) == len(right) == len(minutes_dt)):
+			raise ValueError("Left (%d) and right (%d) counts are not per minute of the data (%d)" % (len(left), len(right), len(minutes_dt)))
+		if not len(minutes_dt):
+			return pd.DataFrame({'left': left, 'right': right}, index=pd.DatetimeIndex(minutes_dt, name='dt'))
+
+		if minutes == 'phase':
+			# Each run of minutes in the same phase is a bin (so a dark phase that spans midnight is one bin)
+			phases = self.TimeData.GetTimes(minutes_dt)
+			bins = np.concatenate(([0], np.cumsum(phases[1:] != phases[:-1])))
+			starts = np.concatenate(([0], np.flatnonzero(bins[1:] != bins[:-1]) + 1))
+			index = minutes_dt[starts]
+		elif isinstance(minutes, (int, np.integer)) and minutes > 0:
+			# Bins line up with the clock (eg, 15 minutes bins start on the hour, quarter past, etc.)
+			bins = minutes_dt.astype(np.int64) // minutes
+			bins -= bins[0]
+			index = (minutes_dt[0].astype(np.int64) // minutes * minutes + minutes * np.arange(bins[-1]+1)).astype('datetime64[m]')
+		else:
+			raise ValueError("Unrecognized bin width, expected positive number of minutes or 'phase': %s" % (minutes,))
 
-			for idx,row in data.iterrows():
-				cumulative.append( (row['start_dt'], row['delta_total_cdf']) )
-				cumulativetotalvolume.append( (row['start_dt'], row['cumulative_total_volume']) )
+		ret = pd.DataFrame({
+			'left': np.bincount(bins, weights=left, minlength=len(index)).astype(np.int64),
+			'right': np.bincount(bins, weights=right, minlength=len(index)).astype(np.int64),
+		}, index=pd.DatetimeIndex(index, name='dt'))
+		if minutes == 'phase':
+			ret['phase'] = phases[starts]
+		return ret
 
-		if len(left):
-			genplotdata(left, self.LeftVsTime, self.LeftCumulative, self.LeftCumulativeTotalVolume, self.LeftBouts, self.LeftInterbouts)
-		if len(right):
-			genplotdata(right, self.RightVsTime, self.RightCumulative, self.RightCumulativeTotalVolume, self.RightBouts, self.RightInterbouts)
+	def _MakeBoutRepetitions(self, minutes):
+		"""
+		Count bins with bouts on each side, reset by bins with bouts on the other side (see BoutRepetitionsData).
+		"""
 
-		# Calculate all the stats
-		self.LeftBoutStats = StatBot(self.LeftBouts)
-		self.LeftInterboutStats = StatBot(self.LeftInterbouts)
-		self.RightBoutStats = StatBot(self.RightBouts)
-		self.RightInterboutStats = StatBot(self.RightInterbouts)
-		self.TotalBoutStats = StatBot(self.LeftBouts + self.RightBouts)
+		data = self.VsTimeData(minutes)
+		lactive = data['left'].to_numpy() > 0
+		ractive = data['right'].to_numpy() > 0
 
-		self.IsProcessed = True
+		def counter(active, reset):
+			# Running count of active bins, less the running count as of the most recent reset
+			# A bin with both is a reset, so it doesn't count
+			cnt = np.cumsum(active & ~reset)
+			return cnt - np.maximum.accumulate(np.where(reset, cnt, 0))
 
-	def PlotVsTime(self, fname, minutes=1):
-		"""
-		Plot bouts against time. Bouts are grouped by the minute.
-		Set @minutes to something other than 1 to pre-group them into larger groups
-		"""
-
-		fig,axes = pyplot.subplots(2)
-		fig.suptitle("VsTime")
-
-		axes[0].set_ylabel("Left (# Bouts)")
-		axes[1].set_ylabel("Right (# Bouts)")
-		axes[1].set_xlabel("Time (min)")
-		fig.autofmt_xdate()
-
-		if minutes != 1:
-			raise NotImplementedError("Minutes group not implemented yet")
-
-		start = self.Spandt[0]
-		end = self.Spandt[1]
-
-		# -------- LEFT --------
-		# Get all the datetime objects and sort them
-		keys = list(self.LeftVsTime.keys())
-		keys.sort()
-
-		# X data is datetime values
-		# Y data is bout counts per time
-		xl = []
-		yl = []
-		startzero = start.replace(second=0,microsecond=0)
-		# Iterate over the whole time so that zeroes can be injected to plot nicely
-		for minute in range(0, int((end-start).total_seconds()/60)+1):
-			dt = startzero + datetime.timedelta(minutes=minute)
-			xl.append(dt)
-			if dt in keys:
-				yl.append(len(self.LeftVsTime[dt]))
-			else:
-				# If there isn't a data point at this time, then there were zero bouts
-				yl.append(0)
-
-
-		# -------- RIGHT --------
-		# Should mirror left except by the use of RightVsTime instead
-		keys = list(self.RightVsTime.keys())
-		keys.sort()
-
-		xr = []
-		yr = []
-		for minute in range(0, int((end-start).total_seconds()/60)+1):
-			dt = startzero + datetime.timedelta(minutes=minute)
-			xr.append(dt)
-			if dt in keys:
-				yr.append(len(self.RightVsTime[dt]))
-			else:
-				yr.append(0)
-
-		# Want y-axis on both to match
-		maxy = max(max(yl), max(yr))
-		if maxy == 0:
-			# If no data, then set a non-zero maximum y value (otherwise matplotlib complains)
-			axes[0].set_ylim(0,1)
-			axes[1].set_ylim(0,1)
-		else:
-			axes[0].set_ylim(0,maxy)
-			axes[1].set_ylim(0,maxy)
+		return pd.DataFrame({
+			'left': counter(lactive, ractive),
+			'right': counter(ractive, lactive),
+		}, index=data.index)
 
-		axes[0].plot(xl, yl)
-		axes[1].plot(xr, yr)
+	def _MakeCumulative(self, side):
+		data = self._Derived('Tables')[side == 'Right']
+		if not len(data):
+			return pd.Series([], dtype=np.float64, index=pd.DatetimeIndex([]))
+		return pd.Series(data['delta_total_cdf'].to_numpy(), index=data['start_dt'])
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+	def _MakeCumulativeTotalVolume(self, side):
+		data = self._Derived('Tables')[side == 'Right']
+		if not len(data):
+			return pd.Series([], dtype=np.float64, index=pd.DatetimeIndex([]))
+		return pd.Series(data['cumulative_total_volume'].to_numpy(), index=data['start_dt'])
 
-	def PlotBoutRepetitions(self, fname, minutes=1):
+	def _MakeBoutStats(self, side):
+		return StatBot(self._Derived('Bouts', side))
+
+	def _MakeInterboutStats(self, side):
+		return StatBot(self._Derived('Interbouts', side))
+
+	def _MakeTotalBoutStats(self, _):
+		return self.LeftBoutStats.Merge(self.RightBoutStats)
+
+	# Derived products, each made on first use and remade if Lefts, Rights, VolumeData, or TimeData change
+
+	# Bout tables (pandas DataFrame) with volume and light/dark phase columns
+	LeftData = property(lambda self: self._Derived('Tables')[0])
+	RightData = property(lambda self: self._Derived('Tables')[1])
+
+	# Tuples of (minimum,maximum) values for datetime and milliseconds values
+	Spandt = property(lambda self: self._Derived('Tables')[2])
+	Spanms = property(lambda self: self._Derived('Tables')[3])
+
+	# Array of bout deltas (ms)
+	LeftBouts = property(lambda self: self._Derived('Bouts', 'Left'))
+	RightBouts = property(lambda self: self._Derived('Bouts', 'Right'))
+
+	# Array of intebout deltas (sec)
+	LeftInterbouts = property(lambda self: self._Derived('Interbouts', 'Left'))
+	RightInterbouts = property(lambda self: self._Derived('Interbouts', 'Right'))
+
+	# Series of bout counts indexed by every minute of the data
+	LeftVsTime = property(lambda self: self._Derived('VsTime', 'Left'))
+	RightVsTime = property(lambda self: self._Derived('VsTime', 'Right'))
+
+	# Cumulative data (Series of cumulative bout time indexed by bout start)
+	LeftCumulative = property(lambda self: self._Derived('Cumulative', 'Left'))
+	RightCumulative = property(lambda self: self._Derived('Cumulative', 'Right'))
+
+	# Cumulative volume data (total) (Series of cumulative volume indexed by bout start)
+	LeftCumulativeTotalVolume = property(lambda self: self._Derived('CumulativeTotalVolume', 'Left'))
+	RightCumulativeTotalVolume = property(lambda self: self._Derived('CumulativeTotalVolume', 'Right'))
+
+	# StatBot of the bouts and interbouts
+	LeftBoutStats = property(lambda self: self._Derived('BoutStats', 'Left'))
+	LeftInterboutStats = property(lambda self: self._Derived('InterboutStats', 'Left'))
+	RightBoutStats = property(lambda self: self._Derived('BoutStats', 'Right'))
+	RightInterboutStats = property(lambda self: self._Derived('InterboutStats', 'Right'))
+	TotalBoutStats = property(lambda self: self._Derived('TotalBoutStats'))
+
+	def VsTimeData(self, minutes=1):
 		"""
-		Plot a cumulative bout count for each tube that is reset when the other tube is used.
+		Get the number of left and right bouts against time as a pandas DataFrame of 'left' and 'right' columns
+		 indexed by the start of each bin, including zeroes for bins without bouts.
+		Bins are @minutes wide (eg, 1, 15, 60) or set @minutes to 'phase' to have a bin per light/dark phase
+		 (a 'phase' column is then included too).
 		"""
 
-		fig,axes = pyplot.subplots(2)
-		fig.suptitle("Bout Repititions")
-
-		axes[0].set_ylabel("Left (# Bouts)")
-		axes[1].set_ylabel("Right (# Bouts)")
-		axes[1].set_xlabel("Time (min)")
-		fig.autofmt_xdate()
-
-		if minutes != 1:
-			raise NotImplementedError("Minutes group not implemented yet")
-
-		start = self.Spandt[0]
-		end = self.Spandt[1]
-
-		# -------- LEFT vs RIGHT --------
-		# Count number of left bouts that is reset when a right bout is encountered
-		# Get all the datetime objects and sort them
-		lkeys = list(self.LeftVsTime.keys())
-		lkeys.sort()
-		rkeys = list(self.RightVsTime.keys())
-		rkeys.sort()
-
-		# X data is datetime values
-		# Y data is bout counts per time
-		xl = []
-		yl = []
-		# Iterate over the whole time so that zeroes can be injected to plot nicely
-		cnt = 0
-		startzero = start.replace(second=0, microsecond=0)
-		for minute in range(0, int((end-start).total_seconds()/60)+1):
-			dt = startzero + datetime.timedelta(minutes=minute)
-			xl.append(dt)
-			if dt in rkeys:
-				cnt = 0
-				yl.append(cnt)
-
-			elif dt in lkeys:
-				cnt += 1
-				yl.append(cnt)
+		return self._Derived('VsTimeData', minutes)
 
-			else:
-				# If there isn't a data point at this time, then there were zero bouts
-				yl.append(cnt)
-
-
-		# -------- RIGHT vs LEFT --------
-		# Count number of right bouts that is reset when a left bout is encountered
-		# X data is datetime values
-		# Y data is bout counts per time
-		xr = []
-		yr = []
-		# Iterate over the whole time so that zeroes can be injected to plot nicely
-		cnt = 0
-		for minute in range(0, int((end-start).total_seconds()/60)+1):
-			dt = startzero + datetime.timedelta(minutes=minute)
-			xr.append(dt)
-			if dt in lkeys:
-				cnt = 0
-				yr.append(cnt)
-
-			elif dt in rkeys:
-				cnt += 1
-				yr.append(cnt)
+	def BoutRepetitionsData(self, minutes=1):
+		"""
+		Get a count for each tube of the time bins with bouts that is reset when the other tube is used, as a
+		 pandas DataFrame of 'left' and 'right' columns indexed by the start of each bin.
+		Bins are the same as VsTimeData(@minutes).
+		"""
 
-			else:
-				# If there isn't a data point at this time, then there were zero bouts
-				yr.append(cnt)
-
-		# Want y-axis on both to match
-		maxy = max(max(yl), max(yr))
-		if maxy == 0:
-			# If no data, then set a non-zero maximum y value (otherwise matplotlib complains)
-			axes[0].set_ylim(0,1)
-			axes[1].set_ylim(0,1)
-		else:
-			axes[0].set_ylim(0,maxy)
-			axes[1].set_ylim(0,maxy)
+		return self._Derived('BoutRepetitions', minutes)
 
-		axes[0].plot(xl, yl)
-		axes[1].plot(xr, yr)
+	def Process(self, rawdata_fname=None):
+		"""
+		Process the raw data in Lefts & Rights into the bout tables.
+		Everything else (bouts, interbouts, VsTime, cumulative data, stats) is made from these when first used.
+		Pass in a file name via @rawdata_fname to save raw processed data to a file (well, two files one for left and one for right).
+		"""
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		left = self.LeftData
+		right = self.RightData
 
-	def PlotCumulativeBoutTimes(self, fname):
+		# Save if file name is provided
+		if rawdata_fname:
+			fname = '%s-left.csv' % os.path.splitext(rawdata_fname)[0]
+			left.to_csv(fname)
+
+			fname = '%s-right.csv' % os.path.splitext(rawdata_fname)[0]
+			right.to_csv(fname)
+
+		self.IsProcessed = True
+
+	def _PlotData(self, plots=None, minutes=1, bins=25, limitextremes=True):
 		"""
-		Plot cumulative bout times.
+		Gather the data for each of @plots (names in _Plots, all of them if None) as plain arrays and values.
+		Returns a dictionary of plot name to the data that the plot's _Draw function takes.
+		See the Plot* functions for @minutes, @bins, and @limitextremes.
 		"""
 
-		fig,axes = pyplot.subplots(1)
-		fig.autofmt_xdate()
-		fig.suptitle("Cumulative Bout Times")
+		if plots is None:
+			plots = [_[0] for _ in _Plots]
 
-		axes.set_xlabel("Time (ms)")
-		axes.set_ylabel("Cumulative Time (sec)")
-		# Data is in milliseconds, so divide each point by 1000.0 to get seconds
+		ret = {}
+		for plot in plots:
+			if plot in ('vstime', 'boutrepititions'):
+				if plot == 'vstime':
+					data = self.VsTimeData(minutes)
+				else:
+					data = self.BoutRepetitionsData(minutes)
+				ret[plot] = (data.index.to_numpy(), data['left'].to_numpy(), data['right'].to_numpy())
+
+			elif plot == 'cumulativebouttimes':
+				# Data is in milliseconds, so divide each point by 1000.0 to get seconds
+				l = self.LeftCumulative
+				r = self.RightCumulative
+				ret[plot] = (l.index.to_numpy(), l.to_numpy()/1000.0, r.index.to_numpy(), r.to_numpy()/1000.0)
+
+			elif plot == 'cumulativevolume':
+				l = self.LeftCumulativeTotalVolume
+				r = self.RightCumulativeTotalVolume
+				ret[plot] = (l.index.to_numpy(), l.to_numpy(), r.index.to_numpy(), r.to_numpy())
+
+			elif plot == 'boxplot':
+				ylim = None
+				if limitextremes:
+					# With extreme outliers, the box plot gets squished into nohting so this limits the y-axis
+					# to the min/max data point or no more than the definition of "extreme outlier" of Q25-3*IQR or Q75+3*IQR
+					# This will remove outliers from the plot bu that makes the plot more useful
+
+					if self.LeftBoutStats.Length != 0 and self.RightBoutStats.Length != 0:
+						ymin_l = max(self.LeftBoutStats.Minimum, self.LeftBoutStats.Quartile25 - 3*self.LeftBoutStats.IQR)
+						ymin_r = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
+						ymin = min(ymin_l, ymin_r)
+
+						ymax_l = min(self.LeftBoutStats.Maximum, self.LeftBoutStats.Quartile75 + 3*self.LeftBoutStats.IQR)
+						ymax_r = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
+						ymax = max(ymax_l, ymax_r)
+
+					elif self.LeftBoutStats.Length == 0:
+						ymin = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
+						ymax = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
+					elif self.RightBoutStats.Length == 0:
+						ymin = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
+						ymax = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
+					else:
+						raise NotImplementedError("Plotting no data?")
 
+					# Fudge the bounds a little just to add some padding
+					ylim = (ymin*0.95, ymax*1.05)
 
-		xl = [_[0] for _ in self.LeftCumulative]
-		yl = [_[1]/1000.0 for _ in self.LeftCumulative]
+				ret[plot] = (self.LeftBouts, self.RightBouts, ylim)
 
-		xr = [_[0] for _ in self.RightCumulative]
-		yr = [_[1]/1000.0 for _ in self.RightCumulative]
+			elif plot in ('bouthisto-overlap', 'bouthisto-sidebyside'):
+				ret[plot] = (self.LeftBouts, self.RightBouts, bins)
 
-		# Ensure both start and end at the same x point
-		xmin = min(min(xl),min(xr))
-		xmax = max(max(xl),max(xr))
-		if xl[0] != xmin:
-			xl.insert(0, xmin)
-			yl.insert(0, 0.0)
-		if xr[0] != xmin:
-			xr.insert(0, xmin)
-			yr.insert(0, 0.0)
+			elif plot in ('interbouthisto-overlap', 'interbouthisto-sidebyside'):
+				ret[plot] = (self.LeftInterbouts, self.RightInterbouts, bins)
 
-		if xl[-1] != xmax:
-			xl.append(xmax)
-			yl.append(yl[-1])
-		if xr[-1] != xmax:
-			xr.append(xmax)
-			yr.append(yr[-1])
+			else:
+				raise ValueError("Unrecognized plot '%s'" % plot)
 
-		axes.plot(xl,yl, 'r', label="Left")
-		axes.plot(xr,yr, 'b', label="Right")
+		return ret
 
-		axes.legend(loc="lower right")
+	def _Plot(self, plot, fnames, **kwargs):
+		"""
+		Draw @plot and save it to each of @fnames.
+		"""
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		_Render(plot, self._PlotData([plot], **kwargs)[plot], fnames)
 
-	def PlotCumulativeNormalizedVolume(self, fname, fname_left=None, fname_right=None):
+	def PlotAll(self, prefix, formats=('png',), minutes=1, bins=25, limitextremes=True):
 		"""
-		Plot cumulative volume times normalized to recorded volume over the day.
-		Provide fname_left and/or fname_right to dump left/right data into their own CSV.
+		Plot all of the standard plots in one go, each is saved to "@prefix-<plot name>.<format>"
+		 for every format in @formats (eg, ('png', 'svg')).
+		Plot names are vstime, boutrepititions, cumulativebouttimes, cumulativevolume, boxplot, bouthisto-overlap,
+		 bouthisto-sidebyside, interbouthisto-overlap, and interbouthisto-sidebyside.
+		See the Plot* functions for @minutes, @bins, and @limitextremes.
+		Returns the list of file names written.
 		"""
 
-		fig,axes = pyplot.subplots(1)
-		fig.autofmt_xdate()
-		fig.suptitle("Cumulative Normalized Volume")
+		data = self._PlotData(minutes=minutes, bins=bins, limitextremes=limitextremes)
+
+		ret = []
+		for plot,_ in _Plots:
+			fnames = ['%s-%s.%s' % (prefix, plot, fmt) for fmt in formats]
+			_Render(plot, data[plot], fnames)
+			ret += fnames
 
-		axes.set_xlabel("Time (ms)")
-		axes.set_ylabel("Cumulative Volume (mL)")
+		return ret
 
-		xl = [_[0] for _ in self.LeftCumulativeTotalVolume]
-		yl = [_[1] for _ in self.LeftCumulativeTotalVolume]
+	def PlotVsTime(self, fname, minutes=1):
+		"""
+		Plot bouts against time. Bouts are grouped by the minute.
+		Set @minutes to something other than 1 to pre-group them into larger groups, or 'phase' to group by light/dark phase.
+		"""
 
-		xr = [_[0] for _ in self.RightCumulativeTotalVolume]
-		yr = [_[1] for _ in self.RightCumulativeTotalVolume]
+		self._Plot('vstime', [fname], minutes=minutes)
 
-		# Ensure both start and end at the same x point
-		xmin = min(min(xl),min(xr))
-		xmax = max(max(xl),max(xr))
-		if xl[0] != xmin:
-			xl.insert(0, xmin)
-			yl.insert(0, 0.0)
-		if xr[0] != xmin:
-			xr.insert(0, xmin)
-			yr.insert(0, 0.0)
+	def PlotBoutRepetitions(self, fname, minutes=1):
+		"""
+		Plot a cumulative bout count for each tube that is reset when the other tube is used.
+		Set @minutes to group into larger groups (see BoutRepetitionsData).
+		"""
 
-		if xl[-1] != xmax:
-			xl.append(xmax)
-			yl.append(yl[-1])
-		if xr[-1] != xmax:
-			xr.append(xmax)
-			yr.append(yr[-1])
+		self._Plot('boutrepititions', [fname], minutes=minutes)
 
-		axes.plot(xl,yl, 'r', label="Left")
-		axes.plot(xr,yr, 'b', label="Right")
+	def PlotCumulativeBoutTimes(self, fname):
+		"""
+		Plot cumulative bout times.
+		"""
 
-		axes.legend(loc="lower right")
+		self._Plot('cumulativebouttimes', [fname])
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+	def PlotCumulativeNormalizedVolume(self, fname, fname_left=None, fname_right=None):
+		"""
+		Plot cumulative volume times normalized to recorded volume over the day.
+		Provide fname_left and/or fname_right to dump left/right data into their own CSV.
+		"""
+
+		self._Plot('cumulativevolume', [fname])
 
 		if fname_left:
 			if isinstance(fname_left, str):
 				with open(fname_left + '-left.csv', 'w', newline='') as f:
 					w = csv.writer(f)
-					for dt,val in self.LeftCumulativeTotalVolume:
+					for dt,val in self.LeftCumulativeTotalVolume.items():
 						w.writerow([dt,val])
 			else:
 				w = csv.writer(fname_left)
-				for dt,val in self.LeftCumulativeTotalVolume:
+				for dt,val in self.LeftCumulativeTotalVolume.items():
 					w.writerow([dt,val])
 
 		if fname_right:
 			if isinstance(fname_right, str):
 				with open(fname + '-right.csv', 'w', newline='') as f:
 					w = csv.writer(f)
-					for dt,val in self.RightCumulativeTotalVolume:
+					for dt,val in self.RightCumulativeTotalVolume.items():
 						w.writerow([dt,val])
 			else:
 				w = csv.writer(fname_right)
-				for dt,val in self.RightCumulativeTotalVolume:
+				for dt,val in self.RightCumulativeTotalVolume.items():
 					w.writerow([dt,val])
 
 	def PlotBoutBoxplot(self, fname, limitextremes=True):
@@ -1153,244 +1999,675 @@ class CreedLickometer:
 		@limitextremes, if True, then the ultra extreme outliers are chopped off by fixing the y-axis limits.
 		"""
 
-		fig,axes = pyplot.subplots(1)
-		fig.autofmt_xdate()
-		fig.suptitle("Box Plot")
+		self._Plot('boxplot', [fname], limitextremes=limitextremes)
 
-		axes.set_ylabel('BoutTime (ms)')
-		axes.boxplot( [self.LeftBouts, self.RightBouts], labels=['Left', 'Right'])
-
-		if limitextremes:
-			# With extreme outliers, the box plot gets squished into nohting so this limits the y-axis
-			# to the min/max data point or no more than the definition of "extreme outlier" of Q25-3*IQR or Q75+3*IQR
-			# This will remove outliers from the plot bu that makes the plot more useful
+	def PlotBoutHistogram_Overlap(self, fname, bins=25):
+		"""
+		Plot bouts as a histogram with @bins of data.
+		Left and right data plots are shown on the same axes (overlapping).
+		"""
 
-			if self.LeftBoutStats.Length != 0 and self.RightBoutStats.Length != 0:
-				ymin_l = max(self.LeftBoutStats.Minimum, self.LeftBoutStats.Quartile25 - 3*self.LeftBoutStats.IQR)
-				ymin_r = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
-				ymin = min(ymin_l, ymin_r)
+		self._Plot('bouthisto-overlap', [fname], bins=bins)
 
-				ymax_l = min(self.LeftBoutStats.Maximum, self.LeftBoutStats.Quartile75 + 3*self.LeftBoutStats.IQR)
-				ymax_r = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
-				ymax = max(ymax_l, ymax_r)
+	def PlotBoutHistogram_SideBySide(self, fname, bins=25):
+		"""
+		Plot bouts as a histogram with @bins of data.
+		Left and right data plots are shown side-by-side as separate plots.
+		"""
 
-			elif self.LeftBoutStats.Length == 0:
-				ymin = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
-				ymax = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
-			elif self.RightBoutStats.Length == 0:
-				ymin = max(self.RightBoutStats.Minimum, self.RightBoutStats.Quartile25 - 3*self.RightBoutStats.IQR)
-				ymax = min(self.RightBoutStats.Maximum, self.RightBoutStats.Quartile75 + 3*self.RightBoutStats.IQR)
-			else:
-				raise NotImplementedError("Plotting no data?")
+		self._Plot('bouthisto-sidebyside', [fname], bins=bins)
 
-			# Fudge the bounds a little just to add some padding
-			ymin *= 0.95
-			ymax *= 1.05
+	def PlotInterboutHistogram_Overlap(self, fname, bins=25):
+		"""
+		Plot interbouts as a histogram with @bins of data.
+		Left and right data plots are shown on the same axes (overlapping).
+		"""
 
-			axes.set_ylim((ymin,ymax))
+		self._Plot('interbouthisto-overlap', [fname], bins=bins)
 
-		else:
-			pass
+	def PlotInterboutHistogram_SideBySide(self, fname, bins=25):
+		"""
+		Plot interbouts as a histogram with @bins of data.
+		Left and right data plots are shown side-by-side as separate plots.
+		"""
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		self._Plot('interbouthisto-sidebyside', [fname], bins=bins)
 
-	def PlotBoutHistogram_Overlap(self, fname, bins=25):
+	@staticmethod
+	def SignificanceTests(*objs, permutations=1999, seed=0):
 		"""
-		Plot bouts as a histogram with @bins of data.
-		Left and right data plots are shown on the same axes (overlapping).
+		Test for differences between left and right, and between devices, of CreedLickometer @objs.
+		Permutation tests use @permutations random permutations from a random number generator seeded by @seed,
+		 set @permutations to 0 to skip them (p-values are NaN).
+		Returns a dictionary of pandas DataFrames of p-values (two-sided):
+		 'LeftRight' compares left and right of each stat (eg, bout Mean) across devices, for all stats at once
+		  with paired and unpaired (Welch) t-tests, Mann-Whitney U test, and paired permutation test
+		 'Devices' compares left and right bouts and interbouts within each device with an unpaired (Welch) t-test,
+		  Mann-Whitney U test, and permutation test
+		 'Between' compares the bouts (left and right together) of each pair of devices with an unpaired (Welch) t-test,
+		  Mann-Whitney U test, and permutation test
 		"""
 
-		fig,axes = pyplot.subplots(1)
-		fig.autofmt_xdate()
-		fig.suptitle("Bout Histogram")
+		rng = np.random.default_rng(seed)
+		attrs = ['Length', 'Sum', 'Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
 
-		colors = ['blue', 'orange']
-		axes.hist( [self.LeftBouts, self.RightBouts], bins=bins, color=colors, label=['Left', 'Right'])
-		axes.set_xlabel('Bins of Time (ms)')
-		axes.legend(loc='upper right')
+		def value(stats, attr):
+			v = getattr(stats, attr)
+			return np.nan if v is None else float(v)
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		# Stats as rows, devices as columns
+		rows = []
+		left = []
+		right = []
+		for section,lkey,rkey in (('Bouts', 'LeftBoutStats', 'RightBoutStats'), ('Interbouts', 'LeftInterboutStats', 'RightInterboutStats')):
+			for attr in attrs:
+				rows.append( (section, attr) )
+				left.append( [value(getattr(_, lkey), attr) for _ in objs] )
+				right.append( [value(getattr(_, rkey), attr) for _ in objs] )
+		left = np.array(left).reshape(len(rows), len(objs))
+		right = np.array(right).reshape(len(rows), len(objs))
+
+		leftright = pd.DataFrame(rows, columns=['section', 'stat'])
+		leftright['devices'] = np.count_nonzero(~np.isnan(left - right), axis=1)
+		leftright['paired_t'] = _TTestPaired(left, right)
+		leftright['welch_t'] = _TTestWelch(left, right)
+		leftright['mann_whitney'] = _MannWhitney(left, right)
+		leftright['permutation'] = _PermutationPaired(left, right, permutations, rng)
+
+		def unpaired(x, y):
+			# A pair at a time so raw data isn't padded into one matrix of all of them
+			x = np.asarray(x, dtype=np.float64)
+			y = np.asarray(y, dtype=np.float64)
+			return (
+				_TTestWelch(x[np.newaxis], y[np.newaxis])[0],
+				_MannWhitney(x[np.newaxis], y[np.newaxis])[0],
+				_PermutationUnpaired(x, y, permutations, rng),
+			)
+
+		# Raw data with devices as rows
+		devices = []
+		for section,lkey,rkey in (('Bouts', 'LeftBouts', 'RightBouts'), ('Interbouts', 'LeftInterbouts', 'RightInterbouts')):
+			l = [getattr(_, lkey) for _ in objs]
+			r = [getattr(_, rkey) for _ in objs]
+			df = pd.DataFrame({
+				'device': [_.DeviceID for _ in objs],
+				'section': section,
+				'left_n': [len(_) for _ in l],
+				'right_n': [len(_) for _ in r],
+			})
+			df[['welch_t', 'mann_whitney', 'permutation']] = pd.DataFrame([unpaired(x, y) for x,y in zip(l, r)], columns=['welch_t', 'mann_whitney', 'permutation'], dtype=np.float64)
+			devices.append(df)
+		devices = pd.concat(devices, ignore_index=True)
+
+		# Each pair of devices
+		pairs = list(itertools.combinations(range(len(objs)), 2))
+		bouts = [np.concatenate((_.LeftBouts, _.RightBouts)) for _ in objs]
+		between = pd.DataFrame({
+			'device_a': [objs[i].DeviceID for i,_ in pairs],
+			'device_b': [objs[j].DeviceID for _,j in pairs],
+		})
+		between[['welch_t', 'mann_whitney', 'permutation']] = pd.DataFrame([unpaired(bouts[i], bouts[j]) for i,j in pairs], columns=['welch_t', 'mann_whitney', 'permutation'], dtype=np.float64)
+
+		return {'LeftRight': leftright, 'Devices': devices, 'Between': between}
+
+	# Stats in the stats table as (attribute, label)
+	_StatsTableStats = [
+		('Length', 'N'), ('Sum', 'Sum'), ('Minimum', 'Min'), ('Maximum', 'Max'), ('Mean', 'Mean'),
+		('Quartile25', 'Q25'), ('Median', 'Q50'), ('Quartile75', 'Q75'), ('IQR', 'IQR'),
+		('Percentile90', 'P90'), ('Percentile95', 'P95'), ('Percentile99', 'P99'),
+	]
 
-	def PlotBoutHistogram_SideBySide(self, fname, bins=25):
+	@staticmethod
+	def _StatsRows(objs):
 		"""
-		Plot bouts as a histogram with @bins of data.
-		Left and right data plots are shown side-by-side as separate plots.
+		Generate (section, stat label, side, column, value) for every number in the stats table of @objs, a section
+		 at a time and a stat at a time within it.
+		Column is the index of the object in @objs, the same device can be given more than once (eg, windows of it).
+		The Total section has side 'Total' for each object and column len(@objs) for all of them together.
+		Counts are ints and missing values (no data) are NaN.
 		"""
 
-		fig,axes = pyplot.subplots(1,2)
-		fig.autofmt_xdate()
-		fig.suptitle("Bout Histogram")
+		fullstats = StatBot()
+		for obj in objs:
+			fullstats = fullstats.Merge(obj.TotalBoutStats)
 
-		axes[0].set_xlabel('Left (Bins of Time (ms))')
-		axes[1].set_xlabel('Right (Bins of Time (ms))')
-		axes[0].hist(self.LeftBouts, bins=bins, color='blue')
-		axes[1].hist(self.RightBouts, bins=bins, color='orange')
+		def value(v):
+			if v is None:
+				return np.nan
+			elif isinstance(v, (int, np.integer)):
+				return int(v)
+			else:
+				return float(v)
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		for section,sides in (
+			('Bouts', (('Left', 'LeftBoutStats'), ('Right', 'RightBoutStats'))),
+			('Interbouts', (('Left', 'LeftInterboutStats'), ('Right', 'RightInterboutStats'))),
+			('Total', (('Total', 'TotalBoutStats'),)),
+		):
+			stats = [(cnt, side, getattr(obj, key)) for cnt,obj in enumerate(objs) for side,key in sides]
+			if section == 'Total':
+				stats.append( (len(objs), 'Total', fullstats) )
 
-	def PlotInterboutHistogram_Overlap(self, fname, bins=25):
+			for attr,label in CreedLickometer._StatsTableStats:
+				for column,side,stat in stats:
+					yield (section, label, side, column, value(getattr(stat, attr)))
+
+	@staticmethod
+	def _StatsLabels(objs, labels):
 		"""
-		Plot interbouts as a histogram with @bins of data.
-		Left and right data plots are shown on the same axes (overlapping).
+		Get the label of each of @objs (@labels, or the device IDs if None), plus 'All' for all of them together.
 		"""
 
-		fig,axes = pyplot.subplots(1)
-		fig.autofmt_xdate()
-		fig.suptitle("Interbout Histogram")
+		if labels is None:
+			labels = [_.DeviceID for _ in objs]
+		elif len(labels) != len(objs):
+			raise ValueError("Got %d labels for %d objects" % (len(labels), len(objs)))
+		return list(labels) + ['All']
 
-		colors = ['blue', 'orange']
-		axes.hist( [self.LeftInterbouts, self.RightInterbouts], bins=bins, color=colors, label=['Left', 'Right'])
-		axes.set_xlabel('Bins of Time (ms)')
-		axes.legend(loc='upper right')
+	@staticmethod
+	def StatsTable(*objs, tidy=True, labels=None):
+		"""
+		Get the numbers in the stats table (see PlotStatsTable) of CreedLickometer @objs as a pandas DataFrame.
+		Each object is labeled with @labels, which defaults to the device ID of each object.
+		If @tidy then there's a row for each number with columns section, stat, side, column (index of the object, or
+		 the number of objects for all of them together), label, and value (counts are ints, NaN if no data).
+		Otherwise it's laid out like the workbook with a column per object (named by label) and indexed by section,
+		 stat, and side.
+		"""
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		labels = CreedLickometer._StatsLabels(objs, labels)
 
-	def PlotInterboutHistogram_SideBySide(self, fname, bins=25):
+		rows = list(CreedLickometer._StatsRows(objs))
+		df = pd.DataFrame([_[:4] for _ in rows], columns=['section', 'stat', 'side', 'column'])
+		df['label'] = [labels[_] for _ in df['column']]
+		# Object so that counts stay ints rather than all being made floats
+		df['value'] = pd.Series([_[4] for _ in rows], dtype=object)
+		if tidy:
+			return df
+
+		# Keep the order of the table rather than sorted
+		wide = df.pivot(index=['section', 'stat', 'side'], columns='column', values='value')
+		wide = wide.reindex(index=pd.MultiIndex.from_frame(df[['section', 'stat', 'side']].drop_duplicates()), columns=range(len(labels)))
+		wide.columns = pd.Index(labels, name='label')
+		return wide
+
+	@staticmethod
+	def PlotStatsTable(fname, *objs, permutations=0, seed=0, tidy_fname=None, labels=None):
 		"""
-		Plot interbouts as a histogram with @bins of data.
-		Left and right data plots are shown side-by-side as separate plots.
+		Write the stats of CreedLickometer @objs to an Excel workbook @fname.
+		The p-value of a paired t-test of left and right across devices is put next to each stat, and all of the tests
+		 (see SignificanceTests for @permutations and @seed) are put in a "Tests" sheet.
+		Permutation tests are skipped unless @permutations is set (eg, 1999) as they are slow for a lot of bouts.
+		Columns are headed with @labels, which defaults to the device ID of each object.
+		The workbook is written a row at a time (write-only mode of openpyxl) rather than kept as cells in memory.
+		Set @tidy_fname to also save the same numbers as a tidy table (see StatsTable) to a CSV file, or to a
+		 Parquet file if it ends in .parquet (which needs pyarrow).
 		"""
 
-		fig,axes = pyplot.subplots(1,2)
-		fig.autofmt_xdate()
-		fig.suptitle("Interbout Histogram")
+		headers = CreedLickometer._StatsLabels(objs, labels)[:-1]
+
+		tests = CreedLickometer.SignificanceTests(*objs, permutations=permutations, seed=seed)
+		pvalues = tests['LeftRight']['paired_t'].to_numpy()
+
+		# Each section has its label in A, labels (device IDs) in the next row from E onward, and then a Left and a
+		#  Right row for each stat with the label in B (A1, A29, A57)
+		sections = {'Bouts': 1, 'Interbouts': 29, 'Total': 57}
+		stats = {label:idx for idx,(_,label) in enumerate(CreedLickometer._StatsTableStats)}
+
+		# Rows of the sheet by row number, which are filled in and then written out in order
+		rows = {}
+		def put(row, col, value):
+			r = rows.setdefault(row, [])
+			if len(r) < col:
+				r += [None] * (col - len(r))
+			r[col-1] = value
+
+		for section,start in sections.items():
+			put(start, 1, section)
+			for cnt,header in enumerate(headers):
+				put(start+1, 5+cnt, header)
+
+			for label,idx in stats.items():
+				put(start+2+2*idx, 2, label)
+				put(start+2+2*idx, 3, 'Left')
+				put(start+3+2*idx, 3, 'Right')
+
+				# Paired t-test of left and right (no left/right in the total section)
+				if section != 'Total':
+					p = pvalues[(start != 1)*len(stats) + idx]
+					put(start+2+2*idx, 4, None if np.isnan(p) else float(p))
+
+		# Objects in order from E with all of them together in the last column
+		for section,label,side,column,value in CreedLickometer._StatsRows(objs):
+			# Totals only have the one row, which is the first
+			row = sections[section] + 2 + 2*stats[label] + (side == 'Right')
+			if label not in ('N', 'Sum') and (np.isnan(value) or not value):
+				value = ""
+			put(row, 5+column, value)
+
+		wb = Workbook(write_only=True)
+		ws = wb.create_sheet("Stats")
+		for row in range(1, max(rows)+1):
+			ws.append(rows.get(row, []))
+
+		# All of the tests, one table after another
+		ws = wb.create_sheet("Tests")
+		for title,key in (("Left vs Right across devices", 'LeftRight'), ("Left vs Right within each device", 'Devices'), ("Between devices (bouts)", 'Between')):
+			df = tests[key]
+			ws.append([title])
+			ws.append(list(df.columns))
+			for vals in df.itertuples(index=False):
+				row = []
+				for v in vals:
+					if isinstance(v, (float, np.floating)):
+						v = None if np.isnan(v) else float(v)
+					elif isinstance(v, np.integer):
+						v = int(v)
+					row.append(v)
+				ws.append(row)
+			ws.append([])
 
-		axes[0].set_xlabel('Left (Bins of Time (ms))')
-		axes[1].set_xlabel('Right (Bins of Time (ms))')
-		axes[0].hist(self.LeftInterbouts, bins=bins, color='blue')
-		axes[1].hist(self.RightInterbouts, bins=bins, color='orange')
+		wb.save(fname)
 
-		# SAVE IT
-		fig.savefig(fname)
-		pyplot.close()
+		if tidy_fname is not None:
+			df = CreedLickometer.StatsTable(*objs, labels=labels)
+			if tidy_fname.lower().endswith('.parquet'):
+				# Columns have to be one type for parquet, so counts are floats there
+				df['label'] = df['label'].astype(str)
+				df['value'] = df['value'].astype(np.float64)
+				df.to_parquet(tidy_fname, index=False)
+			else:
+				df.to_csv(tidy_fname, index=False)
 
-	@staticmethod
-	def PlotStatsTable(fname, *objs):
-		wb = Workbook()
-		ws = wb.active
-		ws.title = "Stats"
 
-		# Section labels
-		ws['A1'] = 'Bouts'
-		ws['A29'] = 'Interbouts'
-		ws['A57'] = 'Total'
+# -------------------------------------------------------------------------------------------------
+# Drawing of plots
+# Each _Draw function takes a matplotlib Figure and the plain data from CreedLickometer._PlotData for that plot,
+#  so drawing does not need the CreedLickometer object (or pyplot)
 
-		# Same row headers for bouts and interbouts
-		header = ['N', 'Sum', 'Min', 'Max', 'Mean', 'Q25', 'Q50', 'Q75', 'IQR','P90','P95','P99']
+def _DrawOverTime(fig, title, data):
+	"""
+	Draw left and right counts over time on separate axes with the same y-axis limits.
+	"""
 
-		# Put in device IDs as columns for each section
-		for pos in ([2,5], [30,5], [58,5]): # E2 and E30 and E58
-			for obj in objs:
-				ws.cell(pos[0],pos[1]+0).value = obj.DeviceID
-				pos[1] += 1
+	x,yl,yr = data
 
-		# Make headers for each section
-		for pos in ([3,2], [31,2], [59,2]): #B3 and B31 and B59
-			for h in header:
-				# Header info
-				ws.cell(pos[0]+0, pos[1]).value = h
-				ws.cell(pos[0]+0, pos[1]+1).value = 'Left'
-				ws.cell(pos[0]+1, pos[1]+1).value = 'Right'
+	axes = fig.subplots(2)
+	fig.suptitle(title)
 
-				col_a = get_column_letter(pos[1]+2+1)
-				col_b = get_column_letter(pos[1]+2+1 + len(objs)-1)
+	axes[0].set_ylabel("Left (# Bouts)")
+	axes[1].set_ylabel("Right (# Bouts)")
+	axes[1].set_xlabel("Time (min)")
+	fig.autofmt_xdate()
 
-				#ws.cell(pos[0]+0, pos[1]+2).value = '=ttest(%s%d:%s%d, %s%d:%s%d, 2,1)' % (col_a,pos[0]+0, col_b,pos[0]+0, col_a,pos[0]+1, col_b,pos[0]+1)
+	# Want y-axis on both to match
+	maxy = max(max(yl), max(yr))
+	if maxy == 0:
+		# If no data, then set a non-zero maximum y value (otherwise matplotlib complains)
+		axes[0].set_ylim(0,1)
+		axes[1].set_ylim(0,1)
+	else:
+		axes[0].set_ylim(0,maxy)
+		axes[1].set_ylim(0,maxy)
 
-				pos[0] += 2
+	axes[0].plot(x, yl)
+	axes[1].plot(x, yr)
 
-		# Inject data
-		for cnt,obj in enumerate(objs):
-			# Increment row for each object
-			pos = [3,5+cnt] # E3
+def _DrawVsTime(fig, data):
+	_DrawOverTime(fig, "VsTime", data)
 
-			idx = 0
+def _DrawBoutRepetitions(fig, data):
+	_DrawOverTime(fig, "Bout Repititions", data)
 
-			left = obj.LeftBoutStats
-			right = obj.RightBoutStats
+def _DrawCumulative(fig, title, ylabel, data):
+	"""
+	Draw left and right cumulative data on the same axes, both spanning the same time.
+	"""
 
-			attrs = ['Length', 'Sum', 'Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			possnull = ['Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			for attr in attrs:
-				l = getattr(left, attr)
-				r = getattr(right, attr)
+	xl,yl,xr,yr = data
 
-				if attr in possnull:
-					ws.cell(pos[0]+idx+0, pos[1]).value = l or ""
-					ws.cell(pos[0]+idx+1, pos[1]).value = r or ""
-				else:
-					ws.cell(pos[0]+idx+0, pos[1]).value = l
-					ws.cell(pos[0]+idx+1, pos[1]).value = r
-				idx += 2
+	axes = fig.subplots(1)
+	fig.autofmt_xdate()
+	fig.suptitle(title)
 
-		# Inject data
-		for cnt,obj in enumerate(objs):
-			# Increment row for each object
-			pos = [31,5+cnt] # E31
+	axes.set_xlabel("Time (ms)")
+	axes.set_ylabel(ylabel)
 
-			idx = 0
+	# Ensure both start and end at the same x point
+	xmin = min(min(xl),min(xr))
+	xmax = max(max(xl),max(xr))
+	if xl[0] != xmin:
+		xl = np.concatenate(([xmin], xl))
+		yl = np.concatenate(([0.0], yl))
+	if xr[0] != xmin:
+		xr = np.concatenate(([xmin], xr))
+		yr = np.concatenate(([0.0], yr))
 
-			left = obj.LeftInterboutStats
-			right = obj.RightInterboutStats
+	if xl[-1] != xmax:
+		xl = np.concatenate((xl, [xmax]))
+		yl = np.concatenate((yl, [yl[-1]]))
+	if xr[-1] != xmax:
+		xr = np.concatenate((xr, [xmax]))
+		yr = np.concatenate((yr, [yr[-1]]))
 
-			attrs = ['Length', 'Sum', 'Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			possnull = ['Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			for attr in attrs:
-				l = getattr(left, attr)
-				r = getattr(right, attr)
+	axes.plot(xl,yl, 'r', label="Left")
+	axes.plot(xr,yr, 'b', label="Right")
 
-				if attr in possnull:
-					ws.cell(pos[0]+idx+0, pos[1]).value = l or ""
-					ws.cell(pos[0]+idx+1, pos[1]).value = r or ""
-				else:
-					ws.cell(pos[0]+idx+0, pos[1]).value = l
-					ws.cell(pos[0]+idx+1, pos[1]).value = r
-				idx += 2
+	axes.legend(loc="lower right")
 
-		# Inject data
-		fulldata = []
-		for cnt,obj in enumerate(objs):
-			# Increment row for each object
-			pos = [58,5+cnt] # E58
+def _DrawCumulativeBoutTimes(fig, data):
+	_DrawCumulative(fig, "Cumulative Bout Times", "Cumulative Time (sec)", data)
 
-			idx = 0
+def _DrawCumulativeNormalizedVolume(fig, data):
+	_DrawCumulative(fig, "Cumulative Normalized Volume", "Cumulative Volume (mL)", data)
 
-			fulldata += obj.LeftBouts + obj.RightBouts
-			r = obj.TotalBoutStats
+def _DrawBoutBoxplot(fig, data):
+	left,right,ylim = data
 
-			attrs = ['Length', 'Sum', 'Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			possnull = ['Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-			for attr in attrs:
-				o = getattr(r, attr)
+	axes = fig.subplots(1)
+	fig.autofmt_xdate()
+	fig.suptitle("Box Plot")
 
-				if attr in possnull:
-					ws.cell(pos[0]+idx+1, pos[1]).value = o or ""
-				else:
-					ws.cell(pos[0]+idx+1, pos[1]).value = o
-				idx += 2
+	axes.set_ylabel('BoutTime (ms)')
+	axes.boxplot( [left, right], labels=['Left', 'Right'])
 
-		# Show full stats data in last column
-		fullstats = StatBot(fulldata)
-		attrs = ['Length', 'Sum', 'Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-		possnull = ['Minimum', 'Maximum', 'Mean', 'Quartile25', 'Median', 'Quartile75', 'IQR', 'Percentile90', 'Percentile95', 'Percentile99']
-		pos = [58,5+cnt+1]
-		idx = 0
-		for attr in attrs:
-			o = getattr(fullstats, attr)
-
-			if attr in possnull:
-				ws.cell(pos[0]+idx+1, pos[1]).value = o or ""
+	if ylim is not None:
+		axes.set_ylim(ylim)
+
+def _DrawHistogram_Overlap(fig, title, data):
+	left,right,bins = data
+
+	axes = fig.subplots(1)
+	fig.autofmt_xdate()
+	fig.suptitle(title)
+
+	colors = ['blue', 'orange']
+	axes.hist( [left, right], bins=bins, color=colors, label=['Left', 'Right'])
+	axes.set_xlabel('Bins of Time (ms)')
+	axes.legend(loc='upper right')
+
+def _DrawHistogram_SideBySide(fig, title, data):
+	left,right,bins = data
+
+	axes = fig.subplots(1,2)
+	fig.autofmt_xdate()
+	fig.suptitle(title)
+
+	axes[0].set_xlabel('Left (Bins of Time (ms))')
+	axes[1].set_xlabel('Right (Bins of Time (ms))')
+	axes[0].hist(left, bins=bins, color='blue')
+	axes[1].hist(right, bins=bins, color='orange')
+
+def _DrawBoutHistogram_Overlap(fig, data):
+	_DrawHistogram_Overlap(fig, "Bout Histogram", data)
+
+def _DrawBoutHistogram_SideBySide(fig, data):
+	_DrawHistogram_SideBySide(fig, "Bout Histogram", data)
+
+def _DrawInterboutHistogram_Overlap(fig, data):
+	_DrawHistogram_Overlap(fig, "Interbout Histogram", data)
+
+def _DrawInterboutHistogram_SideBySide(fig, data):
+	_DrawHistogram_SideBySide(fig, "Interbout Histogram", data)
+
+# Standard plots as (name, draw function), names are used as the file name suffix by PlotAll
+_Plots = [
+	('vstime', _DrawVsTime),
+	('boutrepititions', _DrawBoutRepetitions),
+	('cumulativebouttimes', _DrawCumulativeBoutTimes),
+	('cumulativevolume', _DrawCumulativeNormalizedVolume),
+	('boxplot', _DrawBoutBoxplot),
+	('bouthisto-overlap', _DrawBoutHistogram_Overlap),
+	('bouthisto-sidebyside', _DrawBoutHistogram_SideBySide),
+	('interbouthisto-overlap', _DrawInterboutHistogram_Overlap),
+	('interbouthisto-sidebyside', _DrawInterboutHistogram_SideBySide),
+]
+
+def _Render(plot, data, fnames):
+	"""
+	Draw @plot (a name in _Plots) of @data on a new Figure and save it to each of @fnames.
+	Uses the object-oriented Figure so no global pyplot state is involved.
+	"""
+
+	fig = Figure()
+	dict(_Plots)[plot](fig, data)
+	for fname in fnames:
+		fig.savefig(fname)
+
+def _RenderJob(plot, data, fnames, rc):
+	"""
+	Render in a worker process with the matplotlib settings @rc of the parent process (see _Render for the rest).
+	"""
+
+	with matplotlib.rc_context(rc):
+		_Render(plot, data, fnames)
+
+	return fnames
+
+def PlotMany(objs, prefixes=None, formats=('png',), max_workers=None, minutes=1, bins=25, limitextremes=True):
+	"""
+	Plot all of the standard plots (see CreedLickometer.PlotAll) for each of many CreedLickometer @objs,
+	 spreading the rendering over a pool of @max_workers processes (number of CPUs if None).
+	Plots for @objs[i] are saved to "@prefixes[i]-<plot name>.<format>", @prefixes defaults to each object's Filename.
+	Only the data for each plot is sent to the worker processes, not the objects.
+	Returns the list of file names written, in the order of @objs and then plots.
+	"""
+
+	objs = list(objs)
+	if prefixes is None:
+		prefixes = [_.Filename for _ in objs]
+	else:
+		prefixes = list(prefixes)
+		if len(prefixes) != len(objs):
+			raise ValueError("Got %d prefixes for %d objects" % (len(prefixes), len(objs)))
+
+	# Data is gathered in this process as it uses (and caches) the derived data of each object
+	jobs = []
+	for o,prefix in zip(objs, prefixes):
+		data = o._PlotData(minutes=minutes, bins=bins, limitextremes=limitextremes)
+		for plot,_ in _Plots:
+			jobs.append( (plot, data[plot], ['%s-%s.%s' % (prefix, plot, fmt) for fmt in formats]) )
+
+	if max_workers == 1:
+		for job in jobs:
+			_Render(*job)
+	else:
+		# Worker processes may not inherit changes to matplotlib settings (eg, figure size) so pass them along
+		rc = {k:v for k,v in matplotlib.rcParams.items() if k != 'backend' and v != matplotlib.rcParamsDefault[k]}
+
+		with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+			futures = [pool.submit(_RenderJob, plot, data, fnames, rc) for plot,data,fnames in jobs]
+			for future in futures:
+				# Raises any exception from the worker
+				future.result()
+
+	return [fname for _,_,fnames in jobs for fname in fnames]
+
+def PlotCohort(objs, prefix=None, formats=('png',), labels=None, minutes=1, bins=25, limitextremes=True):
+	"""
+	Plot each of the standard plots (see CreedLickometer.PlotAll) of many CreedLickometer @objs as one figure per plot,
+	 with one row per object and the same axis limits on every row so they can be compared.
+	Each is saved to "@prefix-<plot name>.<format>" (or "<plot name>.<format>" if @prefix is None) for every
+	 format in @formats.
+	Rows are labeled with @labels, which defaults to the device ID of each object.
+	See the Plot* functions for @minutes, @bins, and @limitextremes.
+	Returns the list of file names written.
+	"""
+
+	objs = list(objs)
+	if not len(objs):
+		raise ValueError("No data to plot")
+
+	if labels is None:
+		labels = ["Device %s" % _.DeviceID for _ in objs]
+	elif len(labels) != len(objs):
+		raise ValueError("Got %d labels for %d objects" % (len(labels), len(objs)))
+
+	data = [_._PlotData(minutes=minutes, bins=bins, limitextremes=limitextremes) for _ in objs]
+
+	w,h = matplotlib.rcParams['figure.figsize']
+
+	ret = []
+	for plot,draw in _Plots:
+		fig = Figure(figsize=(w, h*len(objs)), layout='constrained')
+		subfigs = fig.subfigures(len(objs), 1, squeeze=False)[:,0]
+		for subfig,label,dat in zip(subfigs, labels, data):
+			with warnings.catch_warnings():
+				# Date labels are still rotated, the layout engine does the spacing instead of autofmt_xdate
+				warnings.filterwarnings('ignore', message='This figure was using a layout engine')
+				draw(subfig, dat[plot])
+			subfig.supylabel(label)
+
+		# Same limits for the same axes on every row
+		for axes in zip(*[_.axes for _ in subfigs]):
+			xlims = np.array([_.get_xlim() for _ in axes])
+			ylims = np.array([_.get_ylim() for _ in axes])
+			for ax in axes:
+				ax.set_xlim(xlims[:,0].min(), xlims[:,1].max())
+				ax.set_ylim(ylims[:,0].min(), ylims[:,1].max())
+
+		for fmt in formats:
+			if prefix is None:
+				fname = '%s.%s' % (plot, fmt)
 			else:
-				ws.cell(pos[0]+idx+1, pos[1]).value = o
-			idx += 2
+				fname = '%s-%s.%s' % (prefix, plot, fmt)
+			fig.savefig(fname)
+			ret.append(fname)
 
-		wb.save(fname)
+	return ret
+
+
+# -------------------------------------------------------------------------------------------------
+# Significance tests
+# Each test compares rows of @a against the same rows of @b (2-D arrays, missing values as NaN) all at once
+#  and returns an array of the two-sided p-value of each row
+
+def _TTestPaired(a, b):
+	"""
+	Paired t-test of each row of @a and @b.
+	"""
+
+	# Rows without enough values are NaN
+	with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+		warnings.simplefilter('ignore', RuntimeWarning)
+		d = a - b
+		n = np.count_nonzero(~np.isnan(d), axis=1)
+		t = np.nanmean(d, axis=1) / (np.nanstd(d, axis=1, ddof=1) / np.sqrt(n))
+		return 2*scipy.special.stdtr(n-1, -np.abs(t))
+
+def _TTestWelch(a, b):
+	"""
+	Unpaired t-test (unequal variances) of each row of @a and @b.
+	"""
+
+	# Rows without enough values are NaN
+	with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+		warnings.simplefilter('ignore', RuntimeWarning)
+		na = np.count_nonzero(~np.isnan(a), axis=1)
+		nb = np.count_nonzero(~np.isnan(b), axis=1)
+		va = np.nanvar(a, axis=1, ddof=1) / na
+		vb = np.nanvar(b, axis=1, ddof=1) / nb
+
+		t = (np.nanmean(a, axis=1) - np.nanmean(b, axis=1)) / np.sqrt(va + vb)
+		df = (va + vb)**2 / (va**2/(na-1) + vb**2/(nb-1))
+		return 2*scipy.special.stdtr(df, -np.abs(t))
+
+def _MannWhitney(a, b):
+	"""
+	Mann-Whitney U test of each row of @a and @b (NaN are missing values), using the normal approximation with tie and
+	 continuity correction.
+	Rows without ties and with no more than 20 values in each group (eg, a stat across devices) use the exact
+	 distribution of U instead, as the approximation is poor for so few values.
+	Rows are ranked one at a time with one sort each.
+	"""
+
+	p = np.full(len(a), np.nan)
+	for i in range(len(a)):
+		x = a[i][~np.isnan(a[i])]
+		y = b[i][~np.isnan(b[i])]
+		na, nb = len(x), len(y)
+		if not na or not nb:
+			continue
+
+		xy = np.concatenate((x, y))
+		n = len(xy)
+		order = np.argsort(xy, kind='stable')
+		srt = xy[order]
+
+		# Runs of tied values in sorted order, each value gets the average rank of its run
+		starts = np.flatnonzero(np.concatenate(([True], srt[1:] != srt[:-1])))
+		ties = np.diff(np.append(starts, n))
+		if na <= 20 and nb <= 20 and len(ties) == n:
+			p[i] = scipy.stats.mannwhitneyu(x, y, method='exact').pvalue
+			continue
+
+		ranks = np.empty(n)
+		ranks[order] = np.repeat(starts + (ties+1)/2, ties)
+
+		u = ranks[:na].sum() - na*(na+1)/2
+		u = max(u, na*nb - u)
+
+		# Each group of t ties takes t^3-t from the variance
+		with np.errstate(divide='ignore', invalid='ignore'):
+			sigma = np.sqrt(na*nb/12 * ((n+1) - (ties.astype(np.float64)**3 - ties).sum()/(n*(n-1))))
+			z = (u - na*nb/2 - 0.5) / sigma
+		p[i] = min(1.0, 2*scipy.special.ndtr(-z))
+
+	return p
+
+def _PermutationPaired(a, b, permutations, rng, chunk=None):
+	"""
+	Paired permutation test of the mean difference of each row of @a and @b by randomly swapping pairs
+	 (flipping the sign of the difference) @permutations times, @chunk permutations at a time for all rows at once
+	 (to keep memory to about a million values if None).
+	"""
+
+	d = a - b
+	if not permutations:
+		return np.full(len(d), np.nan)
+	if chunk is None:
+		chunk = max(1, 2**20 // max(1, d.size))
+
+	valid = ~np.isnan(d)
+	n = np.count_nonzero(valid, axis=1)
+	d = np.where(valid, d, 0.0)
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		observed = np.abs(d.sum(axis=1) / n)
+
+		count = np.zeros(len(d), dtype=np.int64)
+		for start in range(0, permutations, chunk):
+			# Permutation at a time so that @chunk doesn't change the results
+			signs = rng.choice([-1.0, 1.0], size=(min(chunk, permutations-start), d.shape[1])).T
+			means = np.abs(d @ signs / n[:,np.newaxis])
+			count += np.count_nonzero(means >= observed[:,np.newaxis] * (1 - 1e-12), axis=1)
+
+		return np.where(n > 0, (count + 1) / (permutations + 1), np.nan)
+
+def _PermutationUnpaired(a, b, permutations, rng, chunk=None):
+	"""
+	Unpaired permutation test of the difference of means of 1-D @a and @b by randomly shuffling which group each
+	 value is in @permutations times, @chunk permutations at a time (to keep memory to about a million values if None).
+	"""
+
+	if not len(a) or not len(b) or not permutations:
+		return np.nan
+
+	x = np.concatenate((a, b)).astype(np.float64)
+	if chunk is None:
+		chunk = max(1, 2**20 // len(x))
+	total = x.sum()
+	observed = abs(a.mean() - b.mean())
+
+	labels = np.zeros(len(x), dtype=np.float64)
+	labels[:len(a)] = 1.0
+
+	count = 0
+	for start in range(0, permutations, chunk):
+		groups = np.tile(labels, (min(chunk, permutations-start), 1))
+		rng.permuted(groups, axis=1, out=groups)
+		sums = groups @ x
+		means = np.abs(sums/len(a) - (total - sums)/len(b))
+		count += np.count_nonzero(means >= observed * (1 - 1e-12))
 
+	return (count + 1) / (permutations + 1)
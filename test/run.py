@@ -97,15 +97,7 @@ def allfiles():
 
 		#printstats(fname, o)
 
-		o.PlotVsTime(fname + "-vstime.png")
-		o.PlotBoutRepetitions(fname + "-boutrepititions.png")
-		o.PlotCumulativeBoutTimes(fname + "-cumulativebouttimes.png")
-		o.PlotCumulativeNormalizedVolume(fname + "-cumulativevolume.png")
-		o.PlotBoutBoxplot(fname + '-boxplot.png')
-		o.PlotBoutHistogram_Overlap(fname + '-bouthisto-overlap.png')
-		o.PlotBoutHistogram_SideBySide(fname + '-bouthisto-sidebyside.png')
-		o.PlotInterboutHistogram_Overlap(fname + '-interbouthisto-overlap.png')
-		o.PlotInterboutHistogram_SideBySide(fname + '-interbouthisto-sidebyside.png')
+		o.PlotAll(fname)
 
 def merger():
 	v,tz = _getdata()
@@ -123,15 +115,7 @@ def merger():
 	fname = '7-1 Overnight Device 2 merged.CSV'
 	c = CreedLickometer.Merge(a,b)
 
-	c.PlotVsTime(fname + "-vstime.png")
-	c.PlotBoutRepetitions(fname + "-boutrepititions.png")
-	c.PlotCumulativeBoutTimes(fname + "-cumulativebouttimes.png")
-	c.PlotCumulativeNormalizedVolume(fname + "-cumulativevolume.png")
-	c.PlotBoutBoxplot(fname + '-boxplot.png')
-	c.PlotBoutHistogram_Overlap(fname + '-bouthisto-overlap.png')
-	c.PlotBoutHistogram_SideBySide(fname + '-bouthisto-sidebyside.png')
-	c.PlotInterboutHistogram_Overlap(fname + '-interbouthisto-overlap.png')
-	c.PlotInterboutHistogram_SideBySide(fname + '-interbouthisto-sidebyside.png')
+	c.PlotAll(fname)
 
 def truncate():
 	v,tz = _getdata()
@@ -147,15 +131,7 @@ def truncate():
 	b.Filename = "7-1 Overnight Device 6 truncated.CSV"
 	b.Save()
 
-	b.PlotVsTime(fname + "-vstime.png")
-	b.PlotBoutRepetitions(fname + "-boutrepititions.png")
-	b.PlotCumulativeBoutTimes(fname + "-cumulativebouttimes.png")
-	b.PlotCumulativeNormalizedVolume(fname + "-cumulativevolume.png")
-	b.PlotBoutBoxplot(fname + '-boxplot.png')
-	b.PlotBoutHistogram_Overlap(fname + '-bouthisto-overlap.png')
-	b.PlotBoutHistogram_SideBySide(fname + '-bouthisto-sidebyside.png')
-	b.PlotInterboutHistogram_Overlap(fname + '-interbouthisto-overlap.png')
-	b.PlotInterboutHistogram_SideBySide(fname + '-interbouthisto-sidebyside.png')
+	b.PlotAll(fname)
 
 if __name__ == '__main__':
 	#allfiles()
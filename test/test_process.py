@@ -0,0 +1,146 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pycreedlickometer import CreedLickometer, VolumeData, TimeData
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class DailyVolumes:
+	"""
+	Stands in for VolumeData with a set volume drunk from each side every day (from 11:00 to 11:00) so that the
+	 volume columns aren't all zero.
+	Has GetVolume as well as GetVolumes so the same volumes can be given to the original implementation.
+	"""
+
+	Start = datetime.datetime(2024,7,14, 11,0)
+	Left = {1: 1.7, 2: 2.3, 3: 0.9}
+	Right = {1: 2.1, 2: 0.35, 3: 1.45}
+
+	def GetVolume(self, dt, device):
+		idx = (dt - self.Start) // datetime.timedelta(days=1)
+		return {'index': idx, 'delta': (datetime.timedelta(days=1), self.Left[idx], self.Right[idx])}
+
+	def GetVolumes(self, dts, device):
+		idx = (np.asarray(dts, dtype='datetime64[us]') - np.datetime64(self.Start, 'us')) // np.timedelta64(1, 'D')
+		return {
+			'valid': np.ones(len(idx), dtype=bool),
+			'index': idx,
+			'delta': (np.full(len(idx), np.timedelta64(1, 'D')), np.array([self.Left[_] for _ in idx]), np.array([self.Right[_] for _ in idx])),
+		}
+
+
+def load(fname, device=1, v=None):
+	"""
+	Load fixture @fname with volume (VolumeData @v or a fill and measurement) and light/dark data for @device.
+	"""
+
+	if v is None:
+		v = VolumeData()
+		v.AddFill(datetime.datetime(2024,7,15, 9,0), device, 13.0, 13.0)
+		v.AddMeasurement(datetime.datetime(2024,7,15, 11,0), device, 12.0, 12.5)
+
+	tz = TimeData()
+	tz.AddLightPhase( datetime.time(5,0,0), datetime.time(19,0,0) )
+	tz.AddDarkPhase( datetime.time(19,0,0), datetime.time(5,0,0) )
+	tz.Process()
+
+	o = CreedLickometer(os.path.join(FIXTURES, fname))
+	o.AddVolumeData(v)
+	o.AddTimeData(tz)
+	o.Load()
+	return o
+
+
+def test_vstime_seconds():
+	# Last bout starts in a minute after the whole minutes from the first bout to the end
+	o = load('seconds.csv')
+	minutes = o._Derived('Minutes')
+	assert list(minutes) == list(np.array(['2024-07-15T10:00', '2024-07-15T10:01'], dtype='datetime64[m]'))
+
+	# Both sides are counted per minute of the data
+	for counts in (o.LeftVsTime, o.RightVsTime):
+		assert (counts.index.to_numpy(dtype='datetime64[m]') == minutes).all()
+	assert list(o.LeftVsTime) == [1, 1]
+	assert list(o.RightVsTime) == [1, 0]
+
+	data = o.VsTimeData(1)
+	assert list(data['left']) == [1, 1]
+	assert list(data['right']) == [1, 0]
+	assert list(o.BoutRepetitionsData(1)['left']) == [0, 1]
+
+
+def test_process_volume_columns():
+	# Expected values are frozen from the original (groupby.apply) implementation of Process with the same volumes
+	o = load('process.csv', v=DailyVolumes())
+	expected = pd.read_csv(os.path.join(FIXTURES, 'process-expected.csv'), float_precision='round_trip')
+
+	columns = ['step_volume', 'cumulative_volume', 'cumulative_total_volume', 'lightdark_phase_total_volume_cdf', 'light_phase_total_volume_cdf', 'dark_phase_total_volume_cdf']
+	for side,data in (('left', o.LeftData), ('right', o.RightData)):
+		exp = expected[expected['side'] == side].reset_index(drop=True)
+		assert len(data) == len(exp)
+		assert (data['start_ms'].to_numpy() == exp['start_ms'].to_numpy()).all()
+
+		for col in columns:
+			actual = pd.to_numeric(data[col]).to_numpy(dtype=np.float64)
+			# Bit for bit, and None (NaN) in the same places for the phase that a bout isn't in
+			assert np.array_equal(actual, exp[col].to_numpy(), equal_nan=True), (side, col)
+
+
+def test_stats_table_windows():
+	# The same device more than once (windows of it) are separate columns
+	o = load('process.csv', v=DailyVolumes())
+	t = datetime.datetime(2024,7,16, 12,0)
+	first, second = o.TrimAfter(t), o.TrimBefore(t)
+	n = [len(first.LeftBouts), len(second.LeftBouts)]
+	assert all(n)
+
+	df = CreedLickometer.StatsTable(first, second, labels=['first', 'second'])
+	counts = df[(df['section'] == 'Bouts') & (df['stat'] == 'N') & (df['side'] == 'Left')]
+	assert list(counts['column']) == [0, 1]
+	assert list(counts['label']) == ['first', 'second']
+	assert list(counts['value']) == n
+	assert all(type(_) is int for _ in counts['value'])
+
+	wide = CreedLickometer.StatsTable(first, second, tidy=False)
+	assert list(wide.columns) == [o.DeviceID, o.DeviceID, 'All']
+	assert list(wide.loc[('Bouts', 'N', 'Left')])[:2] == n
+
+
+def test_timedata_shared():
+	# Adding processed TimeData to another object doesn't throw away what is made from it
+	a = load('process.csv', v=DailyVolumes())
+	b = CreedLickometer(os.path.join(FIXTURES, 'process.csv'))
+	left = a.LeftData
+	b.AddTimeData(a.TimeData)
+	assert a.LeftData is left
+
+	# Changing the cycles does
+	a.TimeData.AddDarkPhase( datetime.time(4,0,0), datetime.time(5,0,0) )
+	assert a.LeftData is not left
+
+
+def test_volume_fill_one_side():
+	# A bout ending right at a fill of only one side has no volume, rather than NaN volume
+	dt = datetime.datetime(2024,7,16, 9,52)
+	v = VolumeData()
+	v.AddFill(datetime.datetime(2024,7,15, 13,0), 1, 13.0, 13.0)
+	v.AddMeasurement(dt, 1, 11.5, 11.0)
+	v.AddFill(dt, 1, None, 13.0)
+	v.AddMeasurement(datetime.datetime(2024,7,18, 11,0), 1, 7.5, 12.0)
+
+	with pytest.raises(ValueError):
+		v.GetVolume(dt, 1)
+	vols = v.GetVolumes([dt, dt + datetime.timedelta(minutes=1)], 1)
+	assert list(vols['valid']) == [False, True]
+	assert not np.isnan(vols['delta'][1][1])
+
+	# Bout is skipped and the rest of the side still adds up
+	o = load('process.csv', v=v)
+	assert dt not in list(o.LeftData['end_dt'])
+	assert not o.LeftData['cumulative_total_volume'].isna().any()
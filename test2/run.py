@@ -1,11 +1,9 @@
 import datetime
-import functools
 import os
 import re
-import subprocess
 
 from matplotlib import pyplot
-from pycreedlickometer import CreedLickometer, VolumeData, TimeData
+from pycreedlickometer import CreedLickometer, VolumeData, TimeData, PlotMany, PlotCohort
 
 
 def printstats(o):
@@ -165,7 +163,7 @@ def allfiles():
 
 		for f in files:
 			print("", f)
-			o = CreedLickometer('./data/' + f['filename'])
+			o = CreedLickometer('./data/' + f['filename'], cache=True)
 			o.AddVolumeData(v)
 			o.AddTimeData(tz)
 			data[dev].append(o)
@@ -174,7 +172,7 @@ def allfiles():
 		mind = min( [_['sortkey'] for _ in files] )
 		maxd = max( [_['sortkey'] for _ in files] )
 
-		m = functools.reduce(CreedLickometer.Merge, data[dev])
+		m = CreedLickometer.MergeMany(data[dev])
 		m.Filename = "merged/SIP_%03d_%s-%s.csv" % (m.DeviceID, mind,maxd)
 		m.Save()
 		merged.append(m)
@@ -193,24 +191,13 @@ def allfiles():
 
 		#printstats(o)
 
-		fname = o.Filename
-		fnames.append(fname)
-		o.PlotVsTime(fname + "-vstime.png")
-		o.PlotBoutRepetitions(fname + "-boutrepititions.png")
-		o.PlotCumulativeBoutTimes(fname + "-cumulativebouttimes.png")
-		o.PlotCumulativeNormalizedVolume(fname + "-cumulativevolume.png")
-		o.PlotBoutBoxplot(fname + '-boxplot.png')
-		o.PlotBoutHistogram_Overlap(fname + '-bouthisto-overlap.png')
-		o.PlotBoutHistogram_SideBySide(fname + '-bouthisto-sidebyside.png')
-		o.PlotInterboutHistogram_Overlap(fname + '-interbouthisto-overlap.png')
-		o.PlotInterboutHistogram_SideBySide(fname + '-interbouthisto-sidebyside.png')
-
-	# Combine all plots together vertically (-append rather than +append)
-	plots = ['vstime.png', 'boutrepititions.png', 'cumulativebouttimes.png', 'cumulativevolume.png', 'boxplot.png', 'bouthisto-overlap.png', 'bouthisto-sidebyside.png', 'interbouthisto-overlap.png', 'interbouthisto-sidebyside.png']
-	for plot in plots:
-		args = ['convert'] + ['%s-%s' % (_,plot)  for _ in fnames] + ['-append', plot]
-		print(args)
-		subprocess.run(args)
+		fnames.append(o.Filename)
+
+	# Render all plots of all devices across multiple processes
+	PlotMany(merged, fnames)
+
+	# Combine all devices together vertically, one figure per plot
+	PlotCohort(merged)
 
 	# Combine stats into a table
 	CreedLickometer.PlotStatsTable('stats.xlsx', *merged)